@@ -21,6 +21,26 @@ class FunctionPass(ABC):
         """Run the pass on a single function. Returns True if the function was modified."""
         ...
 
+    def run_on_module(
+        self,
+        mod: llvm.Module,
+        ctx: llvm.Context,
+        selected_functions: set[str] | None = None,
+    ) -> bool:
+        """Run the pass on every defined function in the module.
+
+        Returns True if any function was modified. ``selected_functions``
+        restricts the run to the named functions, as in ``PassPipeline.run``.
+        """
+        changed = False
+        for func in mod.functions:
+            if func.is_declaration:
+                continue
+            if selected_functions is not None and func.name not in selected_functions:
+                continue
+            changed |= self.run_on_function(func, ctx)
+        return changed
+
     @classmethod
     @abstractmethod
     def info(cls) -> PassInfo:
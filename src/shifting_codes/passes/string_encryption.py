@@ -136,8 +136,8 @@ class StringEncryptionPass(ModulePass):
                 enc_bytes.append(b ^ key_bytes[j % KEY_LEN])
 
             # Replace initializer with encrypted array
-            enc_consts = [i8.constant(v) for v in enc_bytes]
-            gv.initializer = llvm.const_array(i8, enc_consts)
+            gv.initializer = ctx.const_string(bytes(enc_bytes),
+                                              dont_null_terminate=True)
             gv.set_constant(False)
             if gv.linkage == llvm.Linkage.LinkOnceODR:
                 gv.linkage = llvm.Linkage.Internal
@@ -86,9 +86,8 @@ def _embed_bytecode(mod: llvm.Module, ctx: llvm.Context,
     gv = mod.add_global(arr_ty, f"__vm_bytecode_{name}")
     gv.linkage = llvm.Linkage.Private
     gv.is_global_constant = True
-    # Create initializer from bytes
-    byte_constants = [i8.constant(b) for b in bytecode]
-    gv.initializer = arr_ty.const_array(byte_constants)
+    # One [N x i8] constant data array straight from the bytes
+    gv.initializer = ctx.const_string(bytecode, dont_null_terminate=True)
     return gv
 
 
@@ -276,11 +275,7 @@ class VirtualizationPass(ModulePass):
         # Resolve host function names to llvm.Function objects
         host_fn_map: dict[str, llvm.Function] = {}
         for name in all_host_names:
-            host_fn = None
-            for f in mod.functions:
-                if f.name == name:
-                    host_fn = f
-                    break
+            host_fn = mod.get_function(name)
             if host_fn is None:
                 raise ValueError(f"Host function '{name}' not found in module")
             host_fn_map[name] = host_fn
@@ -305,11 +300,7 @@ class VirtualizationPass(ModulePass):
             # Resolve global variable references
             global_ref_gvs = []
             for gname in global_ref_names:
-                gv = None
-                for g in mod.globals:
-                    if g.name == gname:
-                        gv = g
-                        break
+                gv = mod.get_global(gname)
                 if gv is not None:
                     global_ref_gvs.append(gv)
 
@@ -166,6 +166,15 @@ _PARAM_RE = re.compile(
     r"(?:\s+%(\w[\w.]*))?",         # optional name
 )
 
+# Parameter attributes skipped when looking for a parameter's type token
+_PARAM_ATTRS = frozenset({
+    "noundef", "signext", "zeroext", "readonly", "writeonly", "nocapture",
+    "nonnull", "align", "dereferenceable", "inreg", "byval", "sret",
+})
+
+_TYPE_TOKEN_RE = re.compile(r"^(i\d+|ptr|void|float|double|half|\[.*\]|\{.*\})$")
+_INT_TOKEN_RE = re.compile(r"^\d+$")
+
 
 def discover_functions(ir_text: str) -> list[IRFunction]:
     """Parse LLVM IR text to discover defined functions."""
@@ -189,13 +198,11 @@ def discover_functions(ir_text: str) -> list[IRFunction]:
                 for t in tokens:
                     if t.startswith("%"):
                         pname = t.lstrip("%")
-                    elif t in ("noundef", "signext", "zeroext", "readonly",
-                               "writeonly", "nocapture", "nonnull", "align",
-                               "dereferenceable", "inreg", "byval", "sret"):
+                    elif t in _PARAM_ATTRS:
                         continue
-                    elif re.match(r"^(i\d+|ptr|void|float|double|half|\[.*\]|\{.*\})$", t):
+                    elif _TYPE_TOKEN_RE.match(t):
                         ptype = t
-                    elif re.match(r"^\d+$", t):
+                    elif _INT_TOKEN_RE.match(t):
                         # alignment value after 'align'
                         continue
                 if not pname:
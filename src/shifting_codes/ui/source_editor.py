@@ -115,12 +115,26 @@ class CHighlighter(QSyntaxHighlighter):
     def highlightBlock(self, text: str | None):
         if text is None:
             return
-        # Apply single-line rules
+        # Resolve single-line rules per character first (later rules win),
+        # then issue one setFormat per run of identical format.
+        # Qt offsets are UTF-16 code units, so size the map accordingly.
+        size = len(text.encode("utf-16-le")) // 2
+        char_fmts: list[QTextCharFormat | None] = [None] * size
         for pattern, fmt in self._rules:
             it = pattern.globalMatch(text)
             while it.hasNext():
                 match = it.next()
-                self.setFormat(match.capturedStart(), match.capturedLength(), fmt)
+                start = match.capturedStart()
+                length = match.capturedLength()
+                char_fmts[start:start + length] = [fmt] * length
+
+        run_start = 0
+        for i in range(1, size + 1):
+            if i == size or char_fmts[i] is not char_fmts[run_start]:
+                fmt = char_fmts[run_start]
+                if fmt is not None:
+                    self.setFormat(run_start, i - run_start, fmt)
+                run_start = i
 
         # Handle multi-line /* ... */ comments
         self.setCurrentBlockState(0)
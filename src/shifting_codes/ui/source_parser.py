@@ -2,9 +2,14 @@
 
 from __future__ import annotations
 
+import bisect
+import functools
+import hashlib
+import json
 import os
 import re
 import subprocess
+import tempfile
 from dataclasses import dataclass
 
 from shifting_codes.ui.compiler import get_clang_path
@@ -20,19 +25,44 @@ class AnnotatedFunction:
 
 # Matches C function definitions: return_type name(params) {
 # Captures the function name in group 1.
+# Each modifier and the return type are atomic groups so a failed match
+# cannot re-split them; the modifier loop itself must stay backtrackable
+# so that bare ``long``/``unsigned`` still work as the return type.
 _FUNC_DEF_RE = re.compile(
     r"^[ \t]*"
-    r"(?:(?:static|inline|extern|const|volatile|unsigned|signed|long|short|struct|enum|union)\s+)*"
-    r"(?:\w+(?:\s*\*)*)\s+"  # return type
+    r"(?>(?:static|inline|extern|const|volatile|unsigned|signed|long|short|struct|enum|union)\s+)*"
+    r"(?>\w+(?:\s*\*)*+)\s+"  # return type
     r"(\w+)"                  # function name (group 1)
     r"\s*\([^)]*\)"           # parameter list
     r"\s*\{",                 # opening brace
-    re.MULTILINE,
+    re.MULTILINE | re.ASCII,
 )
 
-_KEYWORDS = {"if", "while", "for", "switch", "else", "do", "return", "sizeof", "typeof"}
+_KEYWORDS = frozenset({"if", "while", "for", "switch", "else", "do", "return", "sizeof", "typeof"})
 
-_ANNOTATION_RE = re.compile(r"@obfuscate")
+_ANNOTATION = "@obfuscate"
+
+# On-disk cache of compile_c_to_ir results, keyed by clang version, flags,
+# source extension and source bytes. Lives under $XDG_CACHE_HOME (default
+# ~/.cache). Set SHIFTING_CODES_NO_IR_CACHE=1 to bypass it.
+_IR_CACHE_DIR = os.path.join(
+    os.environ.get("XDG_CACHE_HOME") or os.path.join(os.path.expanduser("~"), ".cache"),
+    "shifting_codes", "ir",
+)
+_IR_CACHE_ENV = "SHIFTING_CODES_NO_IR_CACHE"
+
+# Sources with quoted includes depend on local headers the key can't see.
+_LOCAL_INCLUDE_RE = re.compile(rb'^[ \t]*#[ \t]*include[ \t]*"', re.MULTILINE)
+
+
+def _line_starts(text: str) -> list[int]:
+    """Return the character offset at which each line of *text* begins."""
+    starts = [0]
+    pos = text.find("\n")
+    while pos >= 0:
+        starts.append(pos + 1)
+        pos = text.find("\n", pos + 1)
+    return starts
 
 
 def parse_annotations(source_text: str) -> list[AnnotatedFunction]:
@@ -41,7 +71,7 @@ def parse_annotations(source_text: str) -> list[AnnotatedFunction]:
     Scans up to 3 lines above each function definition for ``// @obfuscate``
     or ``/* @obfuscate */`` comments.
     """
-    lines = source_text.splitlines()
+    line_starts = _line_starts(source_text)
     results: list[AnnotatedFunction] = []
 
     for m in _FUNC_DEF_RE.finditer(source_text):
@@ -50,28 +80,98 @@ def parse_annotations(source_text: str) -> list[AnnotatedFunction]:
             continue
 
         # Find the line number (1-based)
-        line_number = source_text[:m.start()].count("\n") + 1
+        line_number = bisect.bisect_right(line_starts, m.start())
 
         # Scan up to 3 lines above for @obfuscate annotation
-        annotated = False
-        start_line = max(0, line_number - 1 - 3)  # line_number is 1-based, so -1 for index, -3 for lookback
-        end_line = line_number - 1  # exclusive, the function def line itself
-        for i in range(start_line, end_line):
-            if i < len(lines) and _ANNOTATION_RE.search(lines[i]):
-                annotated = True
-                break
+        lookback_start = line_starts[max(0, line_number - 4)]
+        lookback_end = line_starts[line_number - 1]  # start of the function def line itself
+        annotated = _ANNOTATION in source_text[lookback_start:lookback_end]
 
         results.append(AnnotatedFunction(name=name, line_number=line_number, annotated=annotated))
 
     return results
 
 
+@functools.cache
+def _clang_version(clang_path: str) -> str | None:
+    """Return the full ``clang --version`` output, or None if clang can't run."""
+    try:
+        result = subprocess.run(
+            [clang_path, "--version"], capture_output=True, text=True, timeout=30,
+        )
+    except (OSError, subprocess.TimeoutExpired):
+        return None
+    return result.stdout if result.returncode == 0 else None
+
+
+def _ir_cache_path(cmd: list[str], source_path: str) -> str | None:
+    """Return the cache file for this compile, or None if it must not be cached."""
+    if os.environ.get(_IR_CACHE_ENV):
+        return None
+    try:
+        with open(source_path, "rb") as f:
+            source = f.read()
+    except OSError:
+        return None
+    if _LOCAL_INCLUDE_RE.search(source):
+        return None
+    version = _clang_version(cmd[0])
+    if version is None:
+        return None
+
+    h = hashlib.sha256()
+    h.update(version.encode())
+    h.update("\0".join(cmd[1:-1]).encode())  # flags, without clang and source paths
+    h.update(b"\0")
+    # clang picks the language from the extension, case-sensitively (.c vs .C)
+    h.update(os.path.splitext(source_path)[1].encode())
+    h.update(b"\0")
+    h.update(source)
+    return os.path.join(_IR_CACHE_DIR, h.hexdigest() + ".json")
+
+
+def _read_ir_cache(path: str) -> tuple[str, str] | None:
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            entry = json.load(f)
+        return entry["ir"], entry["warnings"]
+    except (OSError, ValueError, KeyError, TypeError):
+        return None
+
+
+def _write_ir_cache(path: str, ir_text: str, warnings: str) -> None:
+    """Store a result atomically; failures only cost a future cache miss."""
+    try:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+    except OSError:
+        return
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump({"ir": ir_text, "warnings": warnings}, f)
+        os.replace(tmp_path, path)
+    except OSError:
+        pass
+    finally:
+        # Gone after a successful replace; otherwise don't leave it behind.
+        try:
+            os.unlink(tmp_path)
+        except OSError:
+            pass
+
+
 def compile_c_to_ir(
     source_path: str,
     clang_path: str | None = None,
 ) -> tuple[bool, str, str]:
     """Compile a C/C++ source file to LLVM IR text.
 
+    Successful results are cached on disk (see ``_IR_CACHE_DIR``), so
+    recompiling unchanged source with the same clang skips the subprocess.
+    The key does not include the source path, so a cache hit may carry the
+    ``source_filename`` of an earlier compile of identical source. Sources
+    with ``#include "..."`` are never cached.
+
     Returns:
         (success, ir_text_or_error, warnings)
     """
@@ -84,14 +184,24 @@ def compile_c_to_ir(
     if ext in (".cpp", ".cc", ".cxx", ".c++"):
         cmd.insert(1, "-std=c++17")
 
+    cache_path = _ir_cache_path(cmd, source_path)
+    if cache_path is not None:
+        cached = _read_ir_cache(cache_path)
+        if cached is not None:
+            return True, cached[0], cached[1]
+
     try:
         result = subprocess.run(
             cmd, capture_output=True, text=True, timeout=30,
         )
         if result.returncode != 0:
             return False, result.stderr.strip(), ""
-        return True, result.stdout, result.stderr.strip()
     except FileNotFoundError:
         return False, f"clang not found: {clang_path}", ""
     except subprocess.TimeoutExpired:
         return False, "Compilation timed out (30s)", ""
+
+    warnings = result.stderr.strip()
+    if cache_path is not None:
+        _write_ir_cache(cache_path, result.stdout, warnings)
+    return True, result.stdout, warnings
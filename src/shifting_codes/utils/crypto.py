@@ -1,31 +1,64 @@
 """Cryptographic random number generator for obfuscation passes."""
 
+import os
 import random
-import secrets
+
+# Bytes of OS entropy fetched per refill in unseeded mode.
+_ENTROPY_CHUNK = 65536
+
+# Bumped in forked children so that buffered entropy inherited from the
+# parent is discarded instead of being replayed by both processes.
+_fork_generation = 0
+
+
+def _after_fork_in_child() -> None:
+    global _fork_generation
+    _fork_generation += 1
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_after_fork_in_child)
 
 
 class CryptoRandom:
     """Random number generator for obfuscation passes.
 
-    Uses `secrets` for production (cryptographically secure),
-    `random.Random(seed)` for deterministic testing.
+    Uses OS entropy (`os.urandom`, cryptographically secure) for production,
+    `random.Random(seed)` for deterministic testing. In production mode the
+    entropy is fetched in large chunks so that a pass drawing thousands of
+    values costs one syscall per chunk rather than one per draw. A forked child
+    refills its buffer on first use, so it never repeats the parent's values.
     """
 
     def __init__(self, seed: int | None = None):
         self._seeded = seed is not None
         self._rng: random.Random | None = random.Random(seed) if self._seeded else None
+        self._buf = b""
+        self._off = 0
+        self._fork_gen = _fork_generation
+
+    def _randbits(self, k: int) -> int:
+        """Return a non-negative integer with *k* random bits from OS entropy."""
+        nbytes = (k + 7) // 8
+        if self._fork_gen != _fork_generation or self._off + nbytes > len(self._buf):
+            self._buf = os.urandom(max(_ENTROPY_CHUNK, nbytes))
+            self._off = 0
+            self._fork_gen = _fork_generation
+        value = int.from_bytes(self._buf[self._off:self._off + nbytes], "little")
+        self._off += nbytes
+        return value >> (nbytes * 8 - k)
 
     def get_uint32(self) -> int:
         if self._seeded:
             assert self._rng is not None
             return self._rng.getrandbits(32)
-        return secrets.randbits(32)
+        return self._randbits(32)
 
     def get_uint64(self) -> int:
         if self._seeded:
             assert self._rng is not None
             return self._rng.getrandbits(64)
-        return secrets.randbits(64)
+        return self._randbits(64)
 
     def get_range(self, max_val: int) -> int:
         """Return a random integer in [0, max_val)."""
@@ -34,7 +67,12 @@ class CryptoRandom:
         if self._seeded:
             assert self._rng is not None
             return self._rng.randrange(max_val)
-        return secrets.randbelow(max_val)
+        # Rejection sampling, as in secrets.randbelow
+        k = max_val.bit_length()
+        r = self._randbits(k)
+        while r >= max_val:
+            r = self._randbits(k)
+        return r
 
     def get_bool(self) -> bool:
         return self.get_range(2) == 1
@@ -126,8 +126,8 @@ def demote_regs_to_stack(func: llvm.Function) -> None:
                 continue
             used_outside = False
             for use in inst.uses:
-                user = use.user
-                if hasattr(user, 'block') and user.block != bb:
+                user_bb = getattr(use.user, 'block', None)
+                if user_bb is not None and user_bb != bb:
                     used_outside = True
                     break
             if used_outside:
@@ -156,7 +156,8 @@ def demote_regs_to_stack(func: llvm.Function) -> None:
         users_to_fix = []
         for use in inst.uses:
             user = use.user
-            if hasattr(user, 'block') and user.block != inst_bb:
+            user_bb = getattr(user, 'block', None)
+            if user_bb is not None and user_bb != inst_bb:
                 users_to_fix.append(user)
 
         for user in users_to_fix:
@@ -9,23 +9,26 @@ from z3 import And, Int, Or, Solver, sat, set_param
 from shifting_codes.utils.crypto import CryptoRandom
 
 # 15 Boolean truth tables for 2-bit inputs: f(0,0), f(0,1), f(1,0), f(1,1)
-TRUTH_TABLES: list[list[int]] = [
-    [0, 0, 0, 1],  # 0:  x & y
-    [0, 0, 1, 0],  # 1:  x & ~y
-    [0, 0, 1, 1],  # 2:  x
-    [0, 1, 0, 0],  # 3:  ~x & y
-    [0, 1, 0, 1],  # 4:  y
-    [0, 1, 1, 0],  # 5:  x ^ y
-    [0, 1, 1, 1],  # 6:  x | y
-    [1, 0, 0, 0],  # 7:  ~(x | y)
-    [1, 0, 0, 1],  # 8:  ~(x ^ y)
-    [1, 0, 1, 0],  # 9:  ~y
-    [1, 0, 1, 1],  # 10: x | ~y
-    [1, 1, 0, 0],  # 11: ~x
-    [1, 1, 0, 1],  # 12: ~x | y
-    [1, 1, 1, 0],  # 13: ~(x & y)
-    [1, 1, 1, 1],  # 14: -1 (all ones)
-]
+TRUTH_TABLES: tuple[tuple[int, ...], ...] = (
+    (0, 0, 0, 1),  # 0:  x & y
+    (0, 0, 1, 0),  # 1:  x & ~y
+    (0, 0, 1, 1),  # 2:  x
+    (0, 1, 0, 0),  # 3:  ~x & y
+    (0, 1, 0, 1),  # 4:  y
+    (0, 1, 1, 0),  # 5:  x ^ y
+    (0, 1, 1, 1),  # 6:  x | y
+    (1, 0, 0, 0),  # 7:  ~(x | y)
+    (1, 0, 0, 1),  # 8:  ~(x ^ y)
+    (1, 0, 1, 0),  # 9:  ~y
+    (1, 0, 1, 1),  # 10: x | ~y
+    (1, 1, 0, 0),  # 11: ~x
+    (1, 1, 0, 1),  # 12: ~x | y
+    (1, 1, 1, 0),  # 13: ~(x & y)
+    (1, 1, 1, 1),  # 14: -1 (all ones)
+)
+
+# The same table by input combination: TRUTH_TABLE_COLUMNS[j][i] == TRUTH_TABLES[i][j]
+TRUTH_TABLE_COLUMNS: tuple[tuple[int, ...], ...] = tuple(zip(*TRUTH_TABLES))
 
 # Cache for generated coefficients
 _cache: deque[list[int]] = deque(maxlen=100)
@@ -61,8 +64,8 @@ def generate_linear_mba(
         s.set("random_seed", seed_val)
 
         # For each of the 4 input combinations, the linear combination must be 0
-        for j in range(4):
-            equ = sum(X[i] * TRUTH_TABLES[exprs[i]][j] for i in range(num_exprs))
+        for column in TRUTH_TABLE_COLUMNS:
+            equ = sum(X[i] * column[exprs[i]] for i in range(num_exprs))
             s.add(equ == 0)
 
         # At least one coefficient must be non-zero
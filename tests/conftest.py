@@ -1,14 +1,59 @@
 """Shared test fixtures."""
 
+import functools
+import os
+import platform
+import shutil
+import tempfile
+
 import pytest
 import llvm
 
 from shifting_codes.utils.crypto import CryptoRandom
 
+# Set from --skip-verify in pytest_configure, reset in pytest_unconfigure so
+# the option does not outlive its session (in-process pytest.main/pytester).
+_SKIP_VERIFY = False
 
-@pytest.fixture
+
+def pytest_addoption(parser):
+    parser.addoption(
+        "--skip-verify", action="store_true", default=False,
+        help="Skip module verification in tests that use assert_verified().",
+    )
+
+
+def pytest_configure(config):
+    global _SKIP_VERIFY
+    _SKIP_VERIFY = config.getoption("--skip-verify")
+
+
+def pytest_unconfigure(config):
+    global _SKIP_VERIFY
+    _SKIP_VERIFY = False
+
+
+def assert_verified(mod: llvm.Module) -> None:
+    """Assert that *mod* passes the LLVM verifier (no-op under --skip-verify).
+
+    The smoke matrix in test_passes_smoke.py calls ``mod.verify()`` directly,
+    so each pass is still verified once in a --skip-verify run.
+    """
+    if _SKIP_VERIFY:
+        return
+    assert mod.verify(), mod.get_verification_error()
+
+
+@pytest.fixture(scope="session")
 def ctx():
-    """Provide an LLVM context that is cleaned up after the test."""
+    """Provide an LLVM context shared by the whole test session.
+
+    Tests only create modules inside it (always via ``with ctx.create_module``
+    or ``with ctx.parse_ir``), and the types it hands out are uniqued per
+    context, so sharing is safe. Under pytest-xdist each worker is a separate
+    process with its own session, so workers never share a context (or the
+    process-global MBA coefficient cache).
+    """
     with llvm.create_context() as c:
         yield c
 
@@ -19,6 +64,153 @@ def rng():
     return CryptoRandom(seed=42)
 
 
+@pytest.fixture(scope="session")
+def llvm_targets():
+    """Initialize LLVM's target backends once per session, for tests that emit code."""
+    llvm.initialize_all_targets()
+    llvm.initialize_all_target_mcs()
+    llvm.initialize_all_target_infos()
+    llvm.initialize_all_asm_printers()
+    llvm.initialize_all_asm_parsers()
+
+
+# ---------------------------------------------------------------------------
+# Native execution: bindings with an in-process ORC JIT run generated code
+# directly; otherwise modules are emitted as objects and linked into a shared
+# library with clang.
+# ---------------------------------------------------------------------------
+
+IS_WINDOWS = platform.system() == "Windows"
+_IS_MACOS = platform.system() == "Darwin"
+_MACHINE = platform.machine()
+
+if IS_WINDOWS:
+    TARGET_TRIPLE = "x86_64-pc-windows-msvc"
+    SHARED_EXT = ".dll"
+elif _IS_MACOS:
+    _arch = "arm64" if _MACHINE == "arm64" else "x86_64"
+    TARGET_TRIPLE = f"{_arch}-apple-darwin"
+    SHARED_EXT = ".dylib"
+else:
+    _arch = "aarch64" if _MACHINE == "aarch64" else "x86_64"
+    TARGET_TRIPLE = f"{_arch}-unknown-linux-gnu"
+    SHARED_EXT = ".so"
+
+HAS_JIT = hasattr(llvm, "JIT")
+CAN_EXECUTE = HAS_JIT or shutil.which("clang") is not None
+
+
+@functools.cache
+def target_machine():
+    """Target machine for TARGET_TRIPLE, created once per process.
+
+    Only for the clang fallback; the ``llvm_targets`` fixture must have run.
+    """
+    target = llvm.get_target_from_triple(TARGET_TRIPLE)
+    reloc = llvm.RelocMode.PIC if not IS_WINDOWS else llvm.RelocMode.Default
+    return llvm.create_target_machine(target, TARGET_TRIPLE, "generic", "",
+                                      reloc_mode=reloc)
+
+
+@pytest.fixture(scope="session")
+def internal_calls_ir(ctx):
+    """IR text of a make_internal_calls() module, built once per session.
+
+    Tests parse a fresh copy with ``ctx.parse_ir(internal_calls_ir)``.
+    """
+    with ctx.create_module("test") as mod:
+        make_internal_calls(ctx, mod)
+        return mod.to_string()
+
+
+@pytest.fixture(scope="session")
+def add_ir(ctx):
+    """IR text of a make_add_function() module, built once per session."""
+    with ctx.create_module("test") as mod:
+        make_add_function(ctx, mod)
+        return mod.to_string()
+
+
+@pytest.fixture(scope="session")
+def arith_ir(ctx):
+    """IR text of a make_arith_function() module, built once per session."""
+    with ctx.create_module("test") as mod:
+        make_arith_function(ctx, mod)
+        return mod.to_string()
+
+
+@pytest.fixture(scope="session")
+def branch_ir(ctx):
+    """IR text of a make_branch_function() module, built once per session."""
+    with ctx.create_module("test") as mod:
+        make_branch_function(ctx, mod)
+        return mod.to_string()
+
+
+@pytest.fixture(scope="session")
+def loop_ir(ctx):
+    """IR text of a make_loop_function() module, built once per session."""
+    with ctx.create_module("test") as mod:
+        make_loop_function(ctx, mod)
+        return mod.to_string()
+
+
+@pytest.fixture(scope="session")
+def serial_checker_ir(request):
+    """The serial checker sample compiled to IR text with clang.
+
+    Relies on compile_c_to_ir's own IR cache, redirected into the pytest cache
+    (.pytest_cache/) so the suite never writes to the user's cache directory.
+    Warm runs skip clang entirely.
+    """
+    # Imported here: source_parser pulls in the Qt-based compiler module.
+    from shifting_codes.samples import get_serial_checker_source
+    from shifting_codes.ui import source_parser
+
+    source = get_serial_checker_source()
+    tmp_fd, tmp_path = tempfile.mkstemp(suffix=".c", prefix="serial_demo_")
+    try:
+        os.write(tmp_fd, source.encode())
+        os.close(tmp_fd)
+        with pytest.MonkeyPatch.context() as mp:
+            mp.setattr(source_parser, "_IR_CACHE_DIR",
+                       str(request.config.cache.mkdir("shifting_codes_ir")))
+            success, ir_or_error, _ = source_parser.compile_c_to_ir(tmp_path)
+        assert success, f"Failed to compile: {ir_or_error}"
+    finally:
+        try:
+            os.unlink(tmp_path)
+        except OSError:
+            pass
+    return ir_or_error
+
+
+def assert_deterministic(ctx, populate, apply, seed: int) -> None:
+    """Build and transform a module twice under the same seed; assert identical IR.
+
+    ``populate`` is either IR text to parse or a callable ``populate(ctx, mod)``
+    that fills an empty module. A callable is run only once; both runs then
+    start from a parsed copy of its output. ``apply(mod, rng)`` runs the pass
+    under test with a fresh ``CryptoRandom(seed)`` each time.
+    """
+    if not isinstance(populate, str):
+        with ctx.create_module("test") as mod:
+            populate(ctx, mod)
+            populate = mod.to_string()
+    results = []
+    for _ in range(2):
+        with ctx.parse_ir(populate) as mod:
+            apply(mod, CryptoRandom(seed=seed))
+            results.append(mod.to_string())
+
+    assert results[0] == results[1]
+
+
+def make_byte_array(ctx: llvm.Context, data: bytes) -> llvm.Value:
+    """Create a ``[len(data) x i8]`` constant from raw bytes in one call."""
+    return ctx.const_string(data, dont_null_terminate=True)
+
+
 def make_add_function(ctx: llvm.Context, mod: llvm.Module) -> llvm.Function:
     """Create a simple function: i32 @add(i32 %a, i32 %b) { ret a + b }"""
     i32 = ctx.types.i32
@@ -124,3 +316,88 @@ def make_loop_function(ctx: llvm.Context, mod: llvm.Module) -> llvm.Function:
         builder.ret(new_sum)
 
     return func
+
+
+def make_internal_calls(ctx: llvm.Context, mod: llvm.Module) -> None:
+    """Populate a module with internal ``helper``/``helper2`` called from public ``main_func``."""
+    i32 = ctx.types.i32
+
+    # Internal helper function
+    helper_ty = ctx.types.function(i32, [i32])
+    helper = mod.add_function("helper", helper_ty)
+    helper.linkage = llvm.Linkage.Internal
+    entry = helper.append_basic_block("entry")
+    with entry.create_builder() as builder:
+        result = builder.add(helper.get_param(0), i32.constant(1), "r")
+        builder.ret(result)
+
+    # Another internal function
+    helper2_ty = ctx.types.function(i32, [i32, i32])
+    helper2 = mod.add_function("helper2", helper2_ty)
+    helper2.linkage = llvm.Linkage.Internal
+    entry2 = helper2.append_basic_block("entry")
+    with entry2.create_builder() as builder:
+        result = builder.mul(helper2.get_param(0), helper2.get_param(1), "r")
+        builder.ret(result)
+
+    # Main function that calls both helpers
+    main_ty = ctx.types.function(i32, [i32])
+    main_func = mod.add_function("main_func", main_ty)
+    main_entry = main_func.append_basic_block("entry")
+    with main_entry.create_builder() as builder:
+        call1 = builder.call(helper, [main_func.get_param(0)], "c1")
+        call2 = builder.call(helper2, [call1, i32.constant(3)], "c2")
+        builder.ret(call2)
+
+
+# ---------------------------------------------------------------------------
+# IR predicates (walk the object graph instead of printing the module)
+# ---------------------------------------------------------------------------
+
+def module_fingerprint(mod: llvm.Module) -> tuple[int, int, int, int]:
+    """Cheap structural summary: (globals, functions, blocks, instructions)."""
+    n_blocks = n_insts = 0
+    for func in mod.functions:
+        for bb in func.basic_blocks:
+            n_blocks += 1
+            n_insts += sum(1 for _ in bb.instructions)
+    return (
+        sum(1 for _ in mod.globals),
+        sum(1 for _ in mod.functions),
+        n_blocks,
+        n_insts,
+    )
+
+
+def has_opcode(func: llvm.Function, opcode: llvm.Opcode) -> bool:
+    """Return True if any instruction in *func* has the given opcode."""
+    return any(
+        inst.opcode == opcode
+        for bb in func.basic_blocks
+        for inst in bb.instructions
+    )
+
+
+def has_indirect_br(func: llvm.Function) -> bool:
+    """Return True if *func* contains an ``indirectbr`` instruction."""
+    return has_opcode(func, llvm.Opcode.IndirectBr)
+
+
+def has_inst_prefix(mod: llvm.Module, prefix: str) -> bool:
+    """Return True if any instruction in *mod* has a name starting with *prefix*."""
+    return any(
+        inst.name.startswith(prefix)
+        for func in mod.functions
+        for bb in func.basic_blocks
+        for inst in bb.instructions
+    )
+
+
+def has_global_prefix(mod: llvm.Module, prefix: str) -> bool:
+    """Return True if any global in *mod* has a name starting with *prefix*."""
+    return any(g.name.startswith(prefix) for g in mod.globals)
+
+
+def has_calling_conv(mod: llvm.Module, ccs) -> bool:
+    """Return True if any function in *mod* uses one of the calling conventions *ccs*."""
+    return any(func.calling_conv in ccs for func in mod.functions)
@@ -1,8 +1,5 @@
 """Tests for the Bogus Control Flow pass (Polaris modular arithmetic)."""
 
-import llvm
-import pytest
-
 from conftest import make_branch_function
 from shifting_codes.passes.bogus_control_flow import BogusControlFlowPass
 from shifting_codes.utils.crypto import CryptoRandom
@@ -105,9 +102,7 @@ def test_bcf_deterministic(ctx):
         with ctx.create_module("test") as mod:
             make_branch_function(ctx, mod)
             p = BogusControlFlowPass(rng=CryptoRandom(seed=77))
-            for func in mod.functions:
-                if not func.is_declaration:
-                    p.run_on_function(func, ctx)
+            p.run_on_module(mod, ctx)
             results.append(mod.to_string())
 
     assert results[0] == results[1]
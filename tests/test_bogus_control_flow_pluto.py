@@ -1,8 +1,5 @@
 """Tests for the Pluto Bogus Control Flow pass."""
 
-import llvm
-import pytest
-
 from conftest import make_add_function, make_branch_function
 from shifting_codes.passes.bogus_control_flow_pluto import PlutoBogusControlFlowPass
 from shifting_codes.utils.crypto import CryptoRandom
@@ -86,9 +83,7 @@ def test_pluto_bcf_deterministic(ctx):
         with ctx.create_module("test") as mod:
             make_branch_function(ctx, mod)
             p = PlutoBogusControlFlowPass(rng=CryptoRandom(seed=77))
-            for func in mod.functions:
-                if not func.is_declaration:
-                    p.run_on_function(func, ctx)
+            p.run_on_module(mod, ctx)
             results.append(mod.to_string())
 
     assert results[0] == results[1]
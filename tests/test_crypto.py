@@ -0,0 +1,48 @@
+"""Tests for CryptoRandom."""
+
+import os
+
+import pytest
+
+from shifting_codes.utils.crypto import CryptoRandom
+
+
+def test_seeded_streams_are_reproducible():
+    a, b = CryptoRandom(seed=7), CryptoRandom(seed=7)
+    assert [a.get_uint64() for _ in range(8)] == [b.get_uint64() for _ in range(8)]
+
+
+def test_unseeded_get_range_in_bounds():
+    rng = CryptoRandom()
+    assert all(0 <= rng.get_range(10) < 10 for _ in range(1000))
+    assert rng.get_range(0) == 0
+
+
+@pytest.mark.skipif(not hasattr(os, "fork"), reason="os.fork not available")
+# xdist workers run helper threads; the child below only draws values, writes
+# to a pipe and _exits, so it takes no locks those threads could hold.
+@pytest.mark.filterwarnings("ignore:This process .* is multi-threaded:DeprecationWarning")
+def test_unseeded_fork_does_not_replay_buffered_entropy():
+    """A forked child must not draw the same values as its parent."""
+    rng = CryptoRandom()
+    rng.get_uint32()  # fill the entropy buffer before forking
+
+    read_fd, write_fd = os.pipe()
+    pid = os.fork()
+    if pid == 0:
+        try:
+            os.close(read_fd)
+            child = [rng.get_uint64() for _ in range(4)]
+            os.write(write_fd, b"".join(v.to_bytes(8, "little") for v in child))
+        finally:
+            os._exit(0)
+
+    os.close(write_fd)
+    parent = [rng.get_uint64() for _ in range(4)]
+    with os.fdopen(read_fd, "rb") as f:
+        data = f.read()
+    os.waitpid(pid, 0)
+    child = [int.from_bytes(data[i:i + 8], "little") for i in range(0, len(data), 8)]
+
+    assert len(child) == 4
+    assert child != parent
@@ -1,44 +1,19 @@
 """Tests for the Control Flow Flattening pass."""
 
-import llvm
-import pytest
-
-from conftest import make_branch_function, make_loop_function
+from conftest import assert_deterministic, assert_verified
 from shifting_codes.passes.flattening import FlatteningPass
-from shifting_codes.utils.crypto import CryptoRandom
-
-
-def test_flattening_diamond(ctx, rng):
-    """Flattening should transform a diamond-pattern function."""
-    with ctx.create_module("test") as mod:
-        make_branch_function(ctx, mod)
-        func = mod.get_function("branch_func")
 
-        original_ir = mod.to_string()
-
-        p = FlatteningPass(rng=rng)
-        changed = p.run_on_function(func, ctx)
 
-        assert changed
-        assert mod.verify(), mod.get_verification_error()
-
-        new_ir = mod.to_string()
-        assert new_ir != original_ir
-        # Should contain dispatch infrastructure
-        assert "cff.dispatch" in new_ir or "cff.state" in new_ir
-
-
-def test_flattening_loop(ctx, rng):
+def test_flattening_loop(ctx, rng, loop_ir):
     """Flattening should transform a loop-containing function."""
-    with ctx.create_module("test") as mod:
-        make_loop_function(ctx, mod)
+    with ctx.parse_ir(loop_ir) as mod:
         func = mod.get_function("sum_to_n")
 
         p = FlatteningPass(rng=rng)
         changed = p.run_on_function(func, ctx)
 
         assert changed
-        assert mod.verify(), mod.get_verification_error()
+        assert_verified(mod)
 
 
 def test_flattening_single_block_noop(ctx, rng):
@@ -55,19 +30,13 @@ def test_flattening_single_block_noop(ctx, rng):
         changed = p.run_on_function(func, ctx)
 
         assert not changed
-        assert mod.verify()
+        assert_verified(mod)
 
 
-def test_flattening_deterministic(ctx):
+def test_flattening_deterministic(ctx, branch_ir):
     """Same seed should produce same flattened output."""
-    results = []
-    for _ in range(2):
-        with ctx.create_module("test") as mod:
-            make_branch_function(ctx, mod)
-            p = FlatteningPass(rng=CryptoRandom(seed=55))
-            for func in mod.functions:
-                if not func.is_declaration:
-                    p.run_on_function(func, ctx)
-            results.append(mod.to_string())
+    def apply(mod, rng):
+        p = FlatteningPass(rng=rng)
+        p.run_on_module(mod, ctx)
 
-    assert results[0] == results[1]
+    assert_deterministic(ctx, branch_ir, apply, seed=55)
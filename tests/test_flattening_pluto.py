@@ -1,9 +1,9 @@
 """Tests for the Pluto Control Flow Flattening pass."""
 
-import llvm
-import pytest
-
-from conftest import make_branch_function, make_loop_function
+from conftest import (
+    assert_verified, has_inst_prefix, make_branch_function, make_loop_function,
+    module_fingerprint,
+)
 from shifting_codes.passes.flattening_pluto import PlutoFlatteningPass
 from shifting_codes.utils.crypto import CryptoRandom
 
@@ -14,17 +14,16 @@ def test_pluto_flattening_diamond(ctx, rng):
         make_branch_function(ctx, mod)
         func = mod.get_function("branch_func")
 
-        original_ir = mod.to_string()
+        original_fp = module_fingerprint(mod)
 
         p = PlutoFlatteningPass(rng=rng)
         changed = p.run_on_function(func, ctx)
 
         assert changed
-        assert mod.verify(), mod.get_verification_error()
+        assert_verified(mod)
 
-        new_ir = mod.to_string()
-        assert new_ir != original_ir
-        assert "cff.dispatch" in new_ir or "cff.state" in new_ir
+        assert module_fingerprint(mod) != original_fp
+        assert has_inst_prefix(mod, "cff.state")
 
 
 def test_pluto_flattening_loop(ctx, rng):
@@ -37,7 +36,7 @@ def test_pluto_flattening_loop(ctx, rng):
         changed = p.run_on_function(func, ctx)
 
         assert changed
-        assert mod.verify(), mod.get_verification_error()
+        assert_verified(mod)
 
 
 def test_pluto_flattening_single_block_noop(ctx, rng):
@@ -54,7 +53,7 @@ def test_pluto_flattening_single_block_noop(ctx, rng):
         changed = p.run_on_function(func, ctx)
 
         assert not changed
-        assert mod.verify()
+        assert_verified(mod)
 
 
 def test_pluto_flattening_deterministic(ctx):
@@ -64,9 +63,7 @@ def test_pluto_flattening_deterministic(ctx):
         with ctx.create_module("test") as mod:
             make_branch_function(ctx, mod)
             p = PlutoFlatteningPass(rng=CryptoRandom(seed=55))
-            for func in mod.functions:
-                if not func.is_declaration:
-                    p.run_on_function(func, ctx)
+            p.run_on_module(mod, ctx)
             results.append(mod.to_string())
 
     assert results[0] == results[1]
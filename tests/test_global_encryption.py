@@ -1,40 +1,11 @@
 """Tests for the Global Encryption pass."""
 
 import llvm
-import pytest
 
+from conftest import (
+    assert_deterministic, assert_verified, has_inst_prefix, make_byte_array,
+)
 from shifting_codes.passes.global_encryption import GlobalEncryptionPass
-from shifting_codes.utils.crypto import CryptoRandom
-
-
-def test_global_encryption_encrypts_internals(ctx, rng):
-    """Should encrypt internal integer globals."""
-    i32 = ctx.types.i32
-    with ctx.create_module("test") as mod:
-        gv = mod.add_global(i32, "secret_value")
-        gv.initializer = i32.constant(42)
-        gv.linkage = llvm.Linkage.Internal
-        gv.set_constant(True)
-
-        fn_ty = ctx.types.function(i32, [])
-        func = mod.add_function("user_func", fn_ty)
-        entry = func.append_basic_block("entry")
-        with entry.create_builder() as builder:
-            val = builder.load(i32, gv, "v")
-            builder.ret(val)
-
-        original_ir = mod.to_string()
-
-        p = GlobalEncryptionPass(rng=rng)
-        changed = p.run_on_module(mod, ctx)
-
-        assert changed
-        assert mod.verify(), mod.get_verification_error()
-
-        new_ir = mod.to_string()
-        assert new_ir != original_ir
-        # Should contain per-function local copy + decrypt
-        assert "ge.copy" in new_ir
 
 
 def test_global_encryption_skips_external(ctx, rng):
@@ -82,11 +53,10 @@ def test_global_encryption_encrypts_array(ctx, rng):
         changed = p.run_on_module(mod, ctx)
 
         assert changed
-        assert mod.verify(), mod.get_verification_error()
+        assert_verified(mod)
 
-        ir = mod.to_string()
         # Should contain per-function local copy + byte-level decrypt
-        assert "ge.copy" in ir
+        assert has_inst_prefix(mod, "ge.copy")
 
 
 def test_global_encryption_encrypts_linkonce_odr_strings(ctx, rng):
@@ -98,7 +68,7 @@ def test_global_encryption_encrypts_linkonce_odr_strings(ctx, rng):
         text = b"Serial accepted\x00"
         arr_ty = ctx.types.array(i8, len(text))
         gv = mod.add_global(arr_ty, "str_secret")
-        gv.initializer = llvm.const_array(i8, [i8.constant(b) for b in text])
+        gv.initializer = make_byte_array(ctx, text)
         gv.linkage = llvm.Linkage.LinkOnceODR
         gv.set_constant(True)
 
@@ -115,13 +85,12 @@ def test_global_encryption_encrypts_linkonce_odr_strings(ctx, rng):
         changed = p.run_on_module(mod, ctx)
 
         assert changed
-        assert mod.verify(), mod.get_verification_error()
+        assert_verified(mod)
 
-        ir = mod.to_string()
         # Original plaintext must be gone from the initializer
-        assert "Serial accepted" not in ir
+        assert "Serial accepted" not in mod.to_string()
         # Per-function local copy + decrypt must be present
-        assert "ge.copy" in ir
+        assert has_inst_prefix(mod, "ge.copy")
         # Linkage must be demoted to internal (can't linker-merge encrypted data)
         for g in mod.globals:
             if g.name == "str_secret":
@@ -129,27 +98,24 @@ def test_global_encryption_encrypts_linkonce_odr_strings(ctx, rng):
                 break
 
 
-def test_global_encryption_deterministic():
+def test_global_encryption_deterministic(ctx):
     """Same seed should produce same encrypted output."""
-    results = []
-    for _ in range(2):
-        with llvm.create_context() as ctx:
-            i32 = ctx.types.i32
-            with ctx.create_module("test") as mod:
-                gv = mod.add_global(i32, "secret_value")
-                gv.initializer = i32.constant(42)
-                gv.linkage = llvm.Linkage.Internal
-                gv.set_constant(True)
-
-                fn_ty = ctx.types.function(i32, [])
-                func = mod.add_function("user_func", fn_ty)
-                entry = func.append_basic_block("entry")
-                with entry.create_builder() as builder:
-                    val = builder.load(i32, gv, "v")
-                    builder.ret(val)
-
-                p = GlobalEncryptionPass(rng=CryptoRandom(seed=88))
-                p.run_on_module(mod, ctx)
-                results.append(mod.to_string())
-
-    assert results[0] == results[1]
+    def populate(ctx, mod):
+        i32 = ctx.types.i32
+        gv = mod.add_global(i32, "secret_value")
+        gv.initializer = i32.constant(42)
+        gv.linkage = llvm.Linkage.Internal
+        gv.set_constant(True)
+
+        fn_ty = ctx.types.function(i32, [])
+        func = mod.add_function("user_func", fn_ty)
+        entry = func.append_basic_block("entry")
+        with entry.create_builder() as builder:
+            val = builder.load(i32, gv, "v")
+            builder.ret(val)
+
+    assert_deterministic(
+        ctx, populate,
+        lambda mod, rng: GlobalEncryptionPass(rng=rng).run_on_module(mod, ctx),
+        seed=88,
+    )
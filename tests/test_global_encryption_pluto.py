@@ -1,38 +1,11 @@
 """Tests for the Pluto Global Encryption pass."""
 
 import llvm
-import pytest
 
+from conftest import (
+    assert_deterministic, assert_verified, has_inst_prefix, make_byte_array,
+)
 from shifting_codes.passes.global_encryption_pluto import PlutoGlobalEncryptionPass
-from shifting_codes.utils.crypto import CryptoRandom
-
-
-def test_pluto_ge_encrypts_internals(ctx, rng):
-    """Should encrypt internal integer globals (no is_global_constant check)."""
-    i32 = ctx.types.i32
-    with ctx.create_module("test") as mod:
-        gv = mod.add_global(i32, "secret_value")
-        gv.initializer = i32.constant(42)
-        gv.linkage = llvm.Linkage.Internal
-
-        fn_ty = ctx.types.function(i32, [])
-        func = mod.add_function("user_func", fn_ty)
-        entry = func.append_basic_block("entry")
-        with entry.create_builder() as builder:
-            val = builder.load(i32, gv, "v")
-            builder.ret(val)
-
-        original_ir = mod.to_string()
-
-        p = PlutoGlobalEncryptionPass(rng=rng)
-        changed = p.run_on_module(mod, ctx)
-
-        assert changed
-        assert mod.verify(), mod.get_verification_error()
-
-        new_ir = mod.to_string()
-        assert new_ir != original_ir
-        assert "ge.dec" in new_ir
 
 
 def test_pluto_ge_skips_external(ctx, rng):
@@ -78,10 +51,9 @@ def test_pluto_ge_encrypts_array(ctx, rng):
         changed = p.run_on_module(mod, ctx)
 
         assert changed
-        assert mod.verify(), mod.get_verification_error()
+        assert_verified(mod)
 
-        ir = mod.to_string()
-        assert "ge.arr.dec" in ir
+        assert has_inst_prefix(mod, "ge.arr.dec")
 
 
 def test_pluto_ge_encrypts_linkonce_odr(ctx, rng):
@@ -92,7 +64,7 @@ def test_pluto_ge_encrypts_linkonce_odr(ctx, rng):
         text = b"Serial accepted\x00"
         arr_ty = ctx.types.array(i8, len(text))
         gv = mod.add_global(arr_ty, "str_secret")
-        gv.initializer = llvm.const_array(i8, [i8.constant(b) for b in text])
+        gv.initializer = make_byte_array(ctx, text)
         gv.linkage = llvm.Linkage.LinkOnceODR
 
         fn_ty = ctx.types.function(i32, [])
@@ -105,37 +77,34 @@ def test_pluto_ge_encrypts_linkonce_odr(ctx, rng):
         changed = p.run_on_module(mod, ctx)
 
         assert changed
-        assert mod.verify(), mod.get_verification_error()
+        assert_verified(mod)
 
-        ir = mod.to_string()
-        assert "Serial accepted" not in ir
-        assert "ge.arr.dec" in ir
+        # Original plaintext must be gone from the initializer
+        assert "Serial accepted" not in mod.to_string()
+        assert has_inst_prefix(mod, "ge.arr.dec")
         for g in mod.globals:
             if g.name == "str_secret":
                 assert g.linkage == llvm.Linkage.Internal
                 break
 
 
-def test_pluto_ge_deterministic():
+def test_pluto_ge_deterministic(ctx):
     """Same seed should produce same encrypted output."""
-    results = []
-    for _ in range(2):
-        with llvm.create_context() as ctx:
-            i32 = ctx.types.i32
-            with ctx.create_module("test") as mod:
-                gv = mod.add_global(i32, "secret_value")
-                gv.initializer = i32.constant(42)
-                gv.linkage = llvm.Linkage.Internal
-
-                fn_ty = ctx.types.function(i32, [])
-                func = mod.add_function("user_func", fn_ty)
-                entry = func.append_basic_block("entry")
-                with entry.create_builder() as builder:
-                    val = builder.load(i32, gv, "v")
-                    builder.ret(val)
-
-                p = PlutoGlobalEncryptionPass(rng=CryptoRandom(seed=88))
-                p.run_on_module(mod, ctx)
-                results.append(mod.to_string())
-
-    assert results[0] == results[1]
+    def populate(ctx, mod):
+        i32 = ctx.types.i32
+        gv = mod.add_global(i32, "secret_value")
+        gv.initializer = i32.constant(42)
+        gv.linkage = llvm.Linkage.Internal
+
+        fn_ty = ctx.types.function(i32, [])
+        func = mod.add_function("user_func", fn_ty)
+        entry = func.append_basic_block("entry")
+        with entry.create_builder() as builder:
+            val = builder.load(i32, gv, "v")
+            builder.ret(val)
+
+    assert_deterministic(
+        ctx, populate,
+        lambda mod, rng: PlutoGlobalEncryptionPass(rng=rng).run_on_module(mod, ctx),
+        seed=88,
+    )
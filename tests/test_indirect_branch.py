@@ -1,42 +1,19 @@
 """Tests for the Indirect Branch pass."""
 
-import llvm
-import pytest
-
-from conftest import make_branch_function, make_loop_function
+from conftest import assert_deterministic, assert_verified, has_indirect_br
 from shifting_codes.passes.indirect_branch import IndirectBranchPass
-from shifting_codes.utils.crypto import CryptoRandom
-
-
-def test_indirect_branch_diamond(ctx, rng):
-    """Conditional branches in diamond pattern should become indirect."""
-    with ctx.create_module("test") as mod:
-        make_branch_function(ctx, mod)
-        original_ir = mod.to_string()
 
-        p = IndirectBranchPass(rng=rng)
-        changed = p.run_on_function(mod.get_function("branch_func"), ctx)
 
-        assert changed
-        assert mod.verify(), mod.get_verification_error()
-
-        new_ir = mod.to_string()
-        assert new_ir != original_ir
-        assert "indirectbr" in new_ir
-        assert "sibr.table" in new_ir
-
-
-def test_indirect_branch_loop(ctx, rng):
+def test_indirect_branch_loop(ctx, rng, loop_ir):
     """Loop back-edge branches should become indirect."""
-    with ctx.create_module("test") as mod:
-        make_loop_function(ctx, mod)
+    with ctx.parse_ir(loop_ir) as mod:
 
         p = IndirectBranchPass(rng=rng)
         changed = p.run_on_function(mod.get_function("sum_to_n"), ctx)
 
         assert changed
-        assert mod.verify(), mod.get_verification_error()
-        assert "indirectbr" in mod.to_string()
+        assert_verified(mod)
+        assert has_indirect_br(mod.get_function("sum_to_n"))
 
 
 def test_indirect_branch_single_block_noop(ctx, rng):
@@ -72,18 +49,15 @@ def test_indirect_branch_unconditional(ctx, rng):
         changed = p.run_on_function(func, ctx)
 
         assert changed
-        assert mod.verify(), mod.get_verification_error()
-        assert "indirectbr" in mod.to_string()
+        assert_verified(mod)
+        assert has_indirect_br(func)
 
 
-def test_indirect_branch_deterministic(ctx):
+def test_indirect_branch_deterministic(ctx, branch_ir):
     """Same seed should produce same output."""
-    results = []
-    for _ in range(2):
-        with ctx.create_module("test") as mod:
-            make_branch_function(ctx, mod)
-            p = IndirectBranchPass(rng=CryptoRandom(seed=99))
-            p.run_on_function(mod.get_function("branch_func"), ctx)
-            results.append(mod.to_string())
-
-    assert results[0] == results[1]
+    assert_deterministic(
+        ctx, branch_ir,
+        lambda mod, rng: IndirectBranchPass(rng=rng).run_on_function(
+            mod.get_function("branch_func"), ctx),
+        seed=99,
+    )
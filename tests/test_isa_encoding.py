@@ -0,0 +1,114 @@
+"""Tests for RISC-V VM instruction encoding and decoding.
+
+Pure integer roundtrips: nothing here touches LLVM.
+"""
+
+import pytest
+
+from shifting_codes.riscybusiness_vm.isa import (
+    Opcode, Funct3Op64, Funct7Op64, Funct3Imm64, Funct3Branch,
+    Funct3Store,
+    encode_r_type, encode_i_type, encode_s_type, encode_b_type,
+    encode_u_type, encode_j_type,
+    decode_opcode, decode_rd, decode_funct3, decode_rs1, decode_rs2,
+    decode_funct7, decode_i_imm, decode_s_imm, decode_b_imm,
+    decode_u_imm, decode_j_imm,
+)
+
+
+# (encode, kwargs, {decode: expected}) -- every listed field must roundtrip.
+_ROUNDTRIP_CASES = [
+    pytest.param(
+        encode_r_type,
+        dict(opcode=Opcode.OP64, rd=1, funct3=Funct3Op64.ADD, rs1=2, rs2=3,
+             funct7=Funct7Op64.NORMAL),
+        {decode_opcode: Opcode.OP64, decode_rd: 1, decode_funct3: Funct3Op64.ADD,
+         decode_rs1: 2, decode_rs2: 3, decode_funct7: Funct7Op64.NORMAL},
+        id="r_add",
+    ),
+    pytest.param(
+        encode_r_type,
+        dict(opcode=Opcode.OP64, rd=5, funct3=Funct3Op64.ADD, rs1=6, rs2=7,
+             funct7=Funct7Op64.SUB_SRA),
+        {decode_opcode: Opcode.OP64, decode_rd: 5, decode_funct3: Funct3Op64.ADD,
+         decode_funct7: Funct7Op64.SUB_SRA},
+        id="r_sub",
+    ),
+    pytest.param(
+        encode_i_type,
+        dict(opcode=Opcode.IMM64, rd=10, funct3=Funct3Imm64.ADDI, rs1=11, imm12=42),
+        {decode_opcode: Opcode.IMM64, decode_rd: 10, decode_funct3: Funct3Imm64.ADDI,
+         decode_rs1: 11, decode_i_imm: 42},
+        id="i_addi",
+    ),
+    pytest.param(
+        encode_i_type,
+        dict(opcode=Opcode.IMM64, rd=1, funct3=Funct3Imm64.ADDI, rs1=2,
+             imm12=(-8) & 0xFFF),
+        {decode_i_imm: -8},
+        id="i_negative_imm",
+    ),
+    pytest.param(
+        encode_s_type,
+        dict(opcode=Opcode.STORE, funct3=Funct3Store.SD, rs1=2, rs2=5, imm12=16),
+        {decode_opcode: Opcode.STORE, decode_funct3: Funct3Store.SD,
+         decode_rs1: 2, decode_rs2: 5, decode_s_imm: 16},
+        id="s_sd",
+    ),
+    pytest.param(
+        encode_s_type,
+        dict(opcode=Opcode.STORE, funct3=Funct3Store.SD, rs1=2, rs2=5,
+             imm12=(-16) & 0xFFF),
+        {decode_s_imm: -16},
+        id="s_negative",
+    ),
+    pytest.param(
+        encode_b_type,
+        dict(opcode=Opcode.BRANCH, funct3=Funct3Branch.BEQ, rs1=1, rs2=2, imm13=8),
+        {decode_opcode: Opcode.BRANCH, decode_funct3: Funct3Branch.BEQ,
+         decode_rs1: 1, decode_rs2: 2, decode_b_imm: 8},
+        id="b_positive",
+    ),
+    pytest.param(
+        encode_b_type,
+        dict(opcode=Opcode.BRANCH, funct3=Funct3Branch.BNE, rs1=3, rs2=4,
+             imm13=(-12) & 0x1FFF),
+        {decode_b_imm: -12},
+        id="b_negative",
+    ),
+    pytest.param(
+        encode_u_type,
+        dict(opcode=Opcode.LUI, rd=5, imm20=0x12345),
+        {decode_opcode: Opcode.LUI, decode_rd: 5, decode_u_imm: 0x12345000},
+        id="u_lui",
+    ),
+    pytest.param(
+        encode_j_type,
+        dict(opcode=Opcode.JAL, rd=0, imm21=100),
+        {decode_opcode: Opcode.JAL, decode_rd: 0, decode_j_imm: 100},
+        id="j_positive",
+    ),
+    pytest.param(
+        encode_j_type,
+        dict(opcode=Opcode.JAL, rd=1, imm21=(-20) & 0x1FFFFF),
+        {decode_j_imm: -20},
+        id="j_negative",
+    ),
+] + [
+    # Every register index fits in rd/rs1/rs2.
+    pytest.param(
+        encode_r_type,
+        dict(opcode=Opcode.OP64, rd=r, funct3=0, rs1=r, rs2=r, funct7=0),
+        {decode_rd: r, decode_rs1: r, decode_rs2: r},
+        id=f"r{r}",
+    )
+    for r in range(32)
+]
+
+
+@pytest.mark.parametrize("encode, kwargs, expected", _ROUNDTRIP_CASES)
+def test_roundtrip(encode, kwargs, expected):
+    """Encoding then decoding recovers every listed field."""
+    inst = encode(**kwargs)
+    decoded = {decode: decode(inst) for decode in expected}
+    assert decoded == expected
@@ -1,9 +1,10 @@
 """Tests for the MBA Obfuscation pass."""
 
-import llvm
 import pytest
 
-from conftest import make_add_function, make_arith_function
+from conftest import (
+    assert_deterministic, make_add_function, make_arith_function, module_fingerprint,
+)
 from shifting_codes.passes.mba_obfuscation import MBAObfuscationPass
 from shifting_codes.utils.crypto import CryptoRandom
 from shifting_codes.utils.mba import generate_linear_mba, clear_cache
@@ -11,16 +12,16 @@ from shifting_codes.utils.mba import generate_linear_mba, clear_cache
 
 def test_mba_coefficients_satisfy_constraints():
     """Generated coefficients must satisfy truth table constraints."""
-    from shifting_codes.utils.mba import TRUTH_TABLES
+    from shifting_codes.utils.mba import TRUTH_TABLE_COLUMNS
 
     clear_cache()
     rng = CryptoRandom(seed=42)
     coeffs = generate_linear_mba(5, rng)
 
     # For each of the 4 input combinations, the linear combination must be 0
-    for j in range(4):
-        total = sum(coeffs[i] * TRUTH_TABLES[i][j] for i in range(15))
-        assert total == 0, f"Constraint failed for input combo {j}: sum={total}"
+    totals = [sum(c * t for c, t in zip(coeffs, column))
+              for column in TRUTH_TABLE_COLUMNS]
+    assert totals == [0, 0, 0, 0], f"Constraint sums per input combo: {totals}"
 
 
 def test_mba_nonzero_coefficients():
@@ -36,16 +37,13 @@ def test_mba_pass_transforms_binary_ops(ctx, rng):
     clear_cache()
     with ctx.create_module("test") as mod:
         make_add_function(ctx, mod)
-        original_ir = mod.to_string()
+        original_fp = module_fingerprint(mod)
 
         p = MBAObfuscationPass(rng=rng)
-        for func in mod.functions:
-            if not func.is_declaration:
-                p.run_on_function(func, ctx)
+        p.run_on_module(mod, ctx)
 
         assert mod.verify(), mod.get_verification_error()
-        new_ir = mod.to_string()
-        assert new_ir != original_ir
+        assert module_fingerprint(mod) != original_fp
 
 
 def test_mba_pass_all_ops(ctx, rng):
@@ -53,30 +51,31 @@ def test_mba_pass_all_ops(ctx, rng):
     clear_cache()
     with ctx.create_module("test") as mod:
         make_arith_function(ctx, mod)
-        original_ir = mod.to_string()
+        original_fp = module_fingerprint(mod)
 
         p = MBAObfuscationPass(rng=rng)
-        for func in mod.functions:
-            if not func.is_declaration:
-                p.run_on_function(func, ctx)
+        p.run_on_module(mod, ctx)
 
         assert mod.verify(), mod.get_verification_error()
-        new_ir = mod.to_string()
-        assert new_ir != original_ir
+        assert module_fingerprint(mod) != original_fp
 
 
-def test_mba_deterministic(ctx):
-    """Same seed should produce same MBA output."""
-    clear_cache()
+def test_mba_deterministic_coefficients():
+    """Same seed should produce the same MBA coefficients."""
     results = []
     for _ in range(2):
         clear_cache()
-        with ctx.create_module("test") as mod:
-            make_add_function(ctx, mod)
-            p = MBAObfuscationPass(rng=CryptoRandom(seed=99))
-            for func in mod.functions:
-                if not func.is_declaration:
-                    p.run_on_function(func, ctx)
-            results.append(mod.to_string())
+        results.append(generate_linear_mba(5, CryptoRandom(seed=99)))
 
     assert results[0] == results[1]
+
+
+@pytest.mark.slow
+def test_mba_deterministic_ir(ctx):
+    """Same seed should produce the same MBA output IR."""
+    def apply(mod, rng):
+        clear_cache()
+        p = MBAObfuscationPass(rng=rng)
+        p.run_on_module(mod, ctx)
+
+    assert_deterministic(ctx, make_add_function, apply, seed=99)
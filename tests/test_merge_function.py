@@ -4,7 +4,7 @@ import llvm
 import pytest
 
 from shifting_codes.passes.merge_function import MergeFunctionPass
-from shifting_codes.utils.crypto import CryptoRandom
+from conftest import assert_deterministic, module_fingerprint
 
 
 def _create_two_void_internal_functions(ctx, mod):
@@ -47,6 +47,14 @@ def _create_two_void_internal_functions(ctx, mod):
         b.ret_void()
 
 
+@pytest.fixture(scope="module")
+def two_void_ir(ctx):
+    """IR text of a _create_two_void_internal_functions() module, built once."""
+    with ctx.create_module("test") as mod:
+        _create_two_void_internal_functions(ctx, mod)
+        return mod.to_string()
+
+
 def _create_two_nonvoid_external_functions(ctx, mod):
     """Create two external int-returning functions and a caller."""
     i32 = ctx.types.i32
@@ -65,11 +73,10 @@ def _create_two_nonvoid_external_functions(ctx, mod):
         b.ret(i32.constant(2))
 
 
-def test_merge_function_two_void(ctx, rng):
+def test_merge_function_two_void(ctx, rng, two_void_ir):
     """Two void internal functions should be merged into a switch dispatcher."""
-    with ctx.create_module("test") as mod:
-        _create_two_void_internal_functions(ctx, mod)
-        original_ir = mod.to_string()
+    with ctx.parse_ir(two_void_ir) as mod:
+        original_fp = module_fingerprint(mod)
 
         p = MergeFunctionPass(rng=rng)
         changed = p.run_on_module(mod, ctx)
@@ -77,16 +84,15 @@ def test_merge_function_two_void(ctx, rng):
         assert changed
         assert mod.verify(), mod.get_verification_error()
 
+        assert module_fingerprint(mod) != original_fp
         new_ir = mod.to_string()
-        assert new_ir != original_ir
         assert "__merged_function" in new_ir
         assert "switch" in new_ir
 
 
-def test_merge_function_call_sites_replaced(ctx, rng):
+def test_merge_function_call_sites_replaced(ctx, rng, two_void_ir):
     """Call sites should be replaced with calls to merged function."""
-    with ctx.create_module("test") as mod:
-        _create_two_void_internal_functions(ctx, mod)
+    with ctx.parse_ir(two_void_ir) as mod:
 
         p = MergeFunctionPass(rng=rng)
         p.run_on_module(mod, ctx)
@@ -100,7 +106,7 @@ def test_merge_function_nonvoid_external(ctx, rng):
     """External non-void functions should be wrapped and merged."""
     with ctx.create_module("test") as mod:
         _create_two_nonvoid_external_functions(ctx, mod)
-        original_ir = mod.to_string()
+        original_fp = module_fingerprint(mod)
 
         p = MergeFunctionPass(rng=rng)
         changed = p.run_on_module(mod, ctx)
@@ -108,8 +114,8 @@ def test_merge_function_nonvoid_external(ctx, rng):
         assert changed
         assert mod.verify(), mod.get_verification_error()
 
+        assert module_fingerprint(mod) != original_fp
         ir = mod.to_string()
-        assert ir != original_ir
         # Original function names preserved as stubs
         assert "define i32 @check_serial" in ir
         assert "define i32 @derive_tier" in ir
@@ -136,14 +142,10 @@ def test_merge_function_single_noop(ctx, rng):
         assert not changed
 
 
-def test_merge_function_deterministic(ctx):
+def test_merge_function_deterministic(ctx, two_void_ir):
     """Same seed should produce same output."""
-    results = []
-    for _ in range(2):
-        with ctx.create_module("test") as mod:
-            _create_two_void_internal_functions(ctx, mod)
-            p = MergeFunctionPass(rng=CryptoRandom(seed=77))
-            p.run_on_module(mod, ctx)
-            results.append(mod.to_string())
-
-    assert results[0] == results[1]
+    assert_deterministic(
+        ctx, two_void_ir,
+        lambda mod, rng: MergeFunctionPass(rng=rng).run_on_module(mod, ctx),
+        seed=77,
+    )
@@ -0,0 +1,122 @@
+"""Smoke tests: each pass transforms a small module, verifies, and leaves its marker."""
+
+import llvm
+import pytest
+
+from conftest import (
+    has_calling_conv, has_global_prefix, has_indirect_br, has_inst_prefix,
+    module_fingerprint,
+)
+from shifting_codes.passes.custom_cc import CustomCCPass
+from shifting_codes.passes.flattening import FlatteningPass
+from shifting_codes.passes.global_encryption import GlobalEncryptionPass
+from shifting_codes.passes.global_encryption_pluto import PlutoGlobalEncryptionPass
+from shifting_codes.passes.indirect_branch import IndirectBranchPass
+from shifting_codes.passes.indirect_call import IndirectCallPass
+from shifting_codes.passes.indirect_call_pluto import PlutoIndirectCallPass
+
+_NON_C_CCS = [
+    llvm.CallConv.Fast, llvm.CallConv.Cold,
+    llvm.CallConv.PreserveMost, llvm.CallConv.PreserveAll,
+    llvm.CallConv.X86RegCall, llvm.CallConv.X86_64_SysV,
+    llvm.CallConv.Win64,
+]
+
+
+def _make_secret_value(ctx, mod, constant):
+    """Internal i32 global ``secret_value`` loaded by ``user_func``."""
+    i32 = ctx.types.i32
+    gv = mod.add_global(i32, "secret_value")
+    gv.initializer = i32.constant(42)
+    gv.linkage = llvm.Linkage.Internal
+    if constant:
+        gv.set_constant(True)
+
+    fn_ty = ctx.types.function(i32, [])
+    func = mod.add_function("user_func", fn_ty)
+    entry = func.append_basic_block("entry")
+    with entry.create_builder() as builder:
+        val = builder.load(i32, gv, "v")
+        builder.ret(val)
+
+
+def _module_pass(pass_cls):
+    return lambda mod, ctx, rng: pass_cls(rng=rng).run_on_module(mod, ctx)
+
+
+def _function_pass(pass_cls, func_name):
+    return lambda mod, ctx, rng: pass_cls(rng=rng).run_on_function(
+        mod.get_function(func_name), ctx)
+
+
+# (populate, apply(mod, ctx, rng), marker(mod), changes_shape)
+# ``populate`` is the name of an IR-text fixture or a callable populate(ctx, mod).
+_CASES = [
+    pytest.param(
+        "internal_calls_ir", _module_pass(CustomCCPass),
+        lambda mod: has_calling_conv(mod, _NON_C_CCS),
+        False,
+        id="custom_cc",
+    ),
+    pytest.param(
+        "branch_ir", _function_pass(FlatteningPass, "branch_func"),
+        lambda mod: has_inst_prefix(mod, "cff.state"),
+        True,
+        id="flattening",
+    ),
+    pytest.param(
+        lambda ctx, mod: _make_secret_value(ctx, mod, constant=True),
+        _module_pass(GlobalEncryptionPass),
+        lambda mod: has_inst_prefix(mod, "ge.copy"),
+        True,
+        id="global_encryption",
+    ),
+    pytest.param(
+        lambda ctx, mod: _make_secret_value(ctx, mod, constant=False),
+        _module_pass(PlutoGlobalEncryptionPass),
+        lambda mod: has_inst_prefix(mod, "ge.dec"),
+        True,
+        id="global_encryption_pluto",
+    ),
+    pytest.param(
+        "branch_ir", _function_pass(IndirectBranchPass, "branch_func"),
+        lambda mod: (has_indirect_br(mod.get_function("branch_func"))
+                     and has_inst_prefix(mod, "sibr.table")),
+        True,
+        id="indirect_branch",
+    ),
+    pytest.param(
+        "internal_calls_ir", _module_pass(IndirectCallPass),
+        lambda mod: has_global_prefix(mod, ".indcall."),
+        True,
+        id="indirect_call",
+    ),
+    pytest.param(
+        "internal_calls_ir", _module_pass(PlutoIndirectCallPass),
+        lambda mod: has_global_prefix(mod, ".indcall."),
+        True,
+        id="indirect_call_pluto",
+    ),
+]
+
+
+@pytest.mark.parametrize("populate, apply, marker, changes_shape", _CASES)
+def test_pass_transforms_and_verifies(request, ctx, rng, populate, apply, marker,
+                                      changes_shape):
+    """The pass reports a change, the module verifies, and its marker is present."""
+    if isinstance(populate, str):
+        mod_cm = ctx.parse_ir(request.getfixturevalue(populate))
+    else:
+        mod_cm = ctx.create_module("test")
+    with mod_cm as mod:
+        if not isinstance(populate, str):
+            populate(ctx, mod)
+        original_fp = module_fingerprint(mod)
+
+        changed = apply(mod, ctx, rng)
+
+        assert changed
+        assert mod.verify(), mod.get_verification_error()
+        if changes_shape:
+            assert module_fingerprint(mod) != original_fp
+        assert marker(mod)
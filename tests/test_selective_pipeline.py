@@ -1,12 +1,13 @@
 """Tests for selective function pipeline."""
 
+import re
+
 import llvm
 import pytest
 
 from shifting_codes.passes import PassPipeline
 from shifting_codes.passes.substitution import SubstitutionPass
 from shifting_codes.passes.global_encryption import GlobalEncryptionPass
-from shifting_codes.utils.crypto import CryptoRandom
 from conftest import make_add_function
 
 
@@ -35,21 +36,13 @@ def two_func_module(ctx):
     mod.__exit__(None, None, None)
 
 
-def _get_func_ir(mod, name):
-    """Get the IR text of a specific function from a module."""
-    full_ir = mod.to_string()
-    # Find the function definition
-    lines = full_ir.splitlines()
-    in_func = False
-    func_lines = []
-    for line in lines:
-        if f"@{name}(" in line and "define" in line:
-            in_func = True
-        if in_func:
-            func_lines.append(line)
-            if line.strip() == "}":
-                break
-    return "\n".join(func_lines)
+# One function definition: from its "define" line through the closing brace.
+_FUNC_RE = re.compile(r"^define[^\n]*@([\w.$]+)\(.*?^\}$", re.MULTILINE | re.DOTALL)
+
+
+def _func_irs(mod):
+    """Map each defined function's name to its IR text, from one print of *mod*."""
+    return {m.group(1): m.group(0) for m in _FUNC_RE.finditer(mod.to_string())}
 
 
 def test_selected_functions_only(ctx, two_func_module, rng):
@@ -57,8 +50,7 @@ def test_selected_functions_only(ctx, two_func_module, rng):
     mod = two_func_module
 
     # Capture original IR for both functions
-    add_before = _get_func_ir(mod, "add")
-    sub_before = _get_func_ir(mod, "sub_func")
+    before = _func_irs(mod)
 
     pipeline = PassPipeline()
     pipeline.add(SubstitutionPass(rng=rng))
@@ -66,12 +58,11 @@ def test_selected_functions_only(ctx, two_func_module, rng):
     # Only apply to 'add'
     changed = pipeline.run(mod, ctx, selected_functions={"add"})
 
-    add_after = _get_func_ir(mod, "add")
-    sub_after = _get_func_ir(mod, "sub_func")
+    after = _func_irs(mod)
 
     # add should be modified, sub_func should be unchanged
-    assert add_after != add_before, "add should have been obfuscated"
-    assert sub_after == sub_before, "sub_func should be unchanged"
+    assert after["add"] != before["add"], "add should have been obfuscated"
+    assert after["sub_func"] == before["sub_func"], "sub_func should be unchanged"
     assert changed is True
 
 
@@ -79,40 +70,36 @@ def test_none_means_all(ctx, two_func_module, rng):
     """selected_functions=None preserves old behavior — all functions processed."""
     mod = two_func_module
 
-    add_before = _get_func_ir(mod, "add")
-    sub_before = _get_func_ir(mod, "sub_func")
+    before = _func_irs(mod)
 
     pipeline = PassPipeline()
     pipeline.add(SubstitutionPass(rng=rng))
 
     pipeline.run(mod, ctx, selected_functions=None)
 
-    add_after = _get_func_ir(mod, "add")
-    sub_after = _get_func_ir(mod, "sub_func")
+    after = _func_irs(mod)
 
     # Both should be modified
-    assert add_after != add_before, "add should have been obfuscated"
-    assert sub_after != sub_before, "sub_func should have been obfuscated"
+    assert after["add"] != before["add"], "add should have been obfuscated"
+    assert after["sub_func"] != before["sub_func"], "sub_func should have been obfuscated"
 
 
 def test_empty_set_skips_all(ctx, two_func_module, rng):
     """Empty set means no FunctionPasses run."""
     mod = two_func_module
 
-    add_before = _get_func_ir(mod, "add")
-    sub_before = _get_func_ir(mod, "sub_func")
+    before = _func_irs(mod)
 
     pipeline = PassPipeline()
     pipeline.add(SubstitutionPass(rng=rng))
 
     changed = pipeline.run(mod, ctx, selected_functions=set())
 
-    add_after = _get_func_ir(mod, "add")
-    sub_after = _get_func_ir(mod, "sub_func")
+    after = _func_irs(mod)
 
     # Neither should be modified
-    assert add_after == add_before, "add should be unchanged"
-    assert sub_after == sub_before, "sub_func should be unchanged"
+    assert after["add"] == before["add"], "add should be unchanged"
+    assert after["sub_func"] == before["sub_func"], "sub_func should be unchanged"
     assert changed is False
 
 
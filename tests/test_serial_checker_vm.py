@@ -6,47 +6,23 @@ Run with:
 
 from __future__ import annotations
 
-import os
-import tempfile
-
 import llvm
 
 from shifting_codes.passes import PassPipeline
 from shifting_codes.passes.bogus_control_flow_pluto import PlutoBogusControlFlowPass
 from shifting_codes.passes.virtualization import VirtualizationPass
-from shifting_codes.samples import get_serial_checker_source
-from shifting_codes.ui.source_parser import compile_c_to_ir
 from shifting_codes.utils.crypto import CryptoRandom
 
 
-def _compile_sample() -> str:
-    """Compile the serial checker sample to LLVM IR text."""
-    source = get_serial_checker_source()
-    tmp_fd, tmp_path = tempfile.mkstemp(suffix=".c", prefix="serial_demo_")
-    try:
-        os.write(tmp_fd, source.encode())
-        os.close(tmp_fd)
-        success, ir_or_error, _ = compile_c_to_ir(tmp_path)
-        assert success, f"Failed to compile: {ir_or_error}"
-        return ir_or_error
-    finally:
-        try:
-            os.unlink(tmp_path)
-        except OSError:
-            pass
-
-
-def test_bcf_then_vm_check_serial_only():
+def test_bcf_then_vm_check_serial_only(serial_checker_ir):
     """Apply Pluto BCF + Virtualization targeting only check_serial.
 
     Prints the full output IR so we can inspect what happened.
     """
-    ir_text = _compile_sample()
-
     selected = {"check_serial"}
 
     with llvm.create_context() as ctx:
-        with ctx.parse_ir(ir_text) as mod:
+        with ctx.parse_ir(serial_checker_ir) as mod:
             rng = CryptoRandom(seed=42)
 
             pipeline = PassPipeline()
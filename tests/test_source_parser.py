@@ -1,6 +1,9 @@
 """Tests for the C/C++ source annotation parser."""
 
-from shifting_codes.ui.source_parser import parse_annotations
+import subprocess
+
+from shifting_codes.ui import source_parser
+from shifting_codes.ui.source_parser import compile_c_to_ir, parse_annotations
 
 
 def test_parse_no_annotations():
@@ -145,3 +148,97 @@ static int helper(int x) {
     assert len(result) == 1
     assert result[0].name == "helper"
     assert result[0].annotated is True
+
+
+def test_modifier_as_return_type():
+    """A bare modifier such as ``unsigned`` can itself be the return type."""
+    source = """\
+// @obfuscate
+unsigned checksum(const char* buf) {
+    return buf[0];
+}
+
+long long total(int n) {
+    return n;
+}
+"""
+    result = parse_annotations(source)
+    names = {f.name: f.annotated for f in result}
+    assert names == {"checksum": True, "total": False}
+
+
+def _fake_clang(monkeypatch, tmp_path):
+    """Route clang through a stub that records each compile; return the call list."""
+    compiles = []
+
+    def fake_run(cmd, **kwargs):
+        if "--version" in cmd:
+            return subprocess.CompletedProcess(cmd, 0, "clang version 0.0.0\n", "")
+        compiles.append(cmd)
+        return subprocess.CompletedProcess(cmd, 0, "define i32 @f() {\n  ret i32 0\n}\n", "")
+
+    monkeypatch.setattr(source_parser, "_IR_CACHE_DIR", str(tmp_path / "ir-cache"))
+    monkeypatch.delenv(source_parser._IR_CACHE_ENV, raising=False)
+    monkeypatch.setattr(source_parser.subprocess, "run", fake_run)
+    return compiles
+
+
+def test_compile_c_to_ir_disk_cache(monkeypatch, tmp_path):
+    """Unchanged source is compiled once; edited source is compiled again."""
+    compiles = _fake_clang(monkeypatch, tmp_path)
+    clang = str(tmp_path / "clang")
+    src = tmp_path / "a.c"
+    src.write_text("int f(void) { return 0; }\n")
+
+    first = compile_c_to_ir(str(src), clang)
+    assert compile_c_to_ir(str(src), clang) == first
+    assert len(compiles) == 1
+
+    src.write_text("int f(void) { return 1; }\n")
+    compile_c_to_ir(str(src), clang)
+    assert len(compiles) == 2
+
+
+def test_compile_c_to_ir_cache_bypass(monkeypatch, tmp_path):
+    """Local includes and SHIFTING_CODES_NO_IR_CACHE both skip the cache."""
+    compiles = _fake_clang(monkeypatch, tmp_path)
+    clang = str(tmp_path / "clang")
+    src = tmp_path / "a.c"
+    src.write_text('#include "a.h"\nint f(void) { return 0; }\n')
+
+    compile_c_to_ir(str(src), clang)
+    compile_c_to_ir(str(src), clang)
+    assert len(compiles) == 2
+
+    src.write_text("int f(void) { return 0; }\n")
+    monkeypatch.setenv(source_parser._IR_CACHE_ENV, "1")
+    compile_c_to_ir(str(src), clang)
+    compile_c_to_ir(str(src), clang)
+    assert len(compiles) == 4
+
+
+def test_compile_c_to_ir_cache_keys_on_extension(monkeypatch, tmp_path):
+    """Identical bytes in a.c and a.C (C vs C++ to clang) are cached separately."""
+    compiles = _fake_clang(monkeypatch, tmp_path)
+    clang = str(tmp_path / "clang")
+    for name in ("a.c", "a.C"):
+        src = tmp_path / name
+        src.write_text("int f(void) { return sizeof('a'); }\n")
+        compile_c_to_ir(str(src), clang)
+    assert len(compiles) == 2
+
+
+def test_compile_c_to_ir_failed_cache_write_leaves_no_temp(monkeypatch, tmp_path):
+    """A cache write that fails part way removes its temporary file."""
+    _fake_clang(monkeypatch, tmp_path)
+
+    def failing_replace(src, dst):
+        raise OSError("replace failed")
+
+    monkeypatch.setattr(source_parser.os, "replace", failing_replace)
+    src = tmp_path / "a.c"
+    src.write_text("int f(void) { return 0; }\n")
+
+    ok, _, _ = compile_c_to_ir(str(src), str(tmp_path / "clang"))
+    assert ok
+    assert list((tmp_path / "ir-cache").iterdir()) == []
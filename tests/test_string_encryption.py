@@ -1,10 +1,9 @@
 """Tests for the String Encryption pass."""
 
 import llvm
-import pytest
 
 from shifting_codes.passes.string_encryption import StringEncryptionPass
-from shifting_codes.utils.crypto import CryptoRandom
+from conftest import assert_deterministic, make_byte_array, module_fingerprint
 
 
 def _make_string_module(ctx, mod, text=b"Hello, World!\x00"):
@@ -15,7 +14,7 @@ def _make_string_module(ctx, mod, text=b"Hello, World!\x00"):
 
     arr_ty = ctx.types.array(i8, len(text))
     gv = mod.add_global(arr_ty, "my_string")
-    gv.initializer = llvm.const_array(i8, [i8.constant(b) for b in text])
+    gv.initializer = make_byte_array(ctx, text)
     gv.linkage = llvm.Linkage.Internal
     gv.set_constant(True)
 
@@ -33,7 +32,7 @@ def test_string_encryption_basic(ctx, rng):
     """Should encrypt an internal string global."""
     with ctx.create_module("test") as mod:
         gv, func = _make_string_module(ctx, mod)
-        original_ir = mod.to_string()
+        original_fp = module_fingerprint(mod)
 
         p = StringEncryptionPass(rng=rng)
         changed = p.run_on_module(mod, ctx)
@@ -41,8 +40,8 @@ def test_string_encryption_basic(ctx, rng):
         assert changed
         assert mod.verify(), mod.get_verification_error()
 
+        assert module_fingerprint(mod) != original_fp
         new_ir = mod.to_string()
-        assert new_ir != original_ir
         # Original plaintext must be gone
         assert "Hello, World!" not in new_ir
         # Per-use stack copy + decrypt must be present
@@ -61,7 +60,7 @@ def test_string_encryption_multiple_strings(ctx, rng):
         for idx, text in enumerate(texts):
             arr_ty = ctx.types.array(i8, len(text))
             gv = mod.add_global(arr_ty, f"str_{idx}")
-            gv.initializer = llvm.const_array(i8, [i8.constant(b) for b in text])
+            gv.initializer = make_byte_array(ctx, text)
             gv.linkage = llvm.Linkage.Internal
             gv.set_constant(True)
             gvs.append(gv)
@@ -128,7 +127,7 @@ def test_string_encryption_skips_external(ctx, rng):
         text = b"external\x00"
         arr_ty = ctx.types.array(i8, len(text))
         gv = mod.add_global(arr_ty, "ext_str")
-        gv.initializer = llvm.const_array(i8, [i8.constant(b) for b in text])
+        gv.initializer = make_byte_array(ctx, text)
         gv.linkage = llvm.Linkage.External
         gv.set_constant(True)
 
@@ -145,35 +144,14 @@ def test_string_encryption_skips_external(ctx, rng):
         assert not changed
 
 
-def test_string_encryption_deterministic():
+def test_string_encryption_deterministic(ctx):
     """Same seed should produce same encrypted output."""
-    results = []
-    for _ in range(2):
-        with llvm.create_context() as ctx:
-            i8 = ctx.types.i8
-            i32 = ctx.types.i32
-            ptr = ctx.types.ptr
-            with ctx.create_module("test") as mod:
-                text = b"deterministic\x00"
-                arr_ty = ctx.types.array(i8, len(text))
-                gv = mod.add_global(arr_ty, "det_str")
-                gv.initializer = llvm.const_array(i8,
-                    [i8.constant(b) for b in text])
-                gv.linkage = llvm.Linkage.Internal
-                gv.set_constant(True)
-
-                fn_ty = ctx.types.function(ptr, [])
-                func = mod.add_function("f", fn_ty)
-                entry = func.append_basic_block("entry")
-                with entry.create_builder() as builder:
-                    p = builder.gep(i8, gv, [i32.constant(0)], "p")
-                    builder.ret(p)
-
-                p = StringEncryptionPass(rng=CryptoRandom(seed=88))
-                p.run_on_module(mod, ctx)
-                results.append(mod.to_string())
-
-    assert results[0] == results[1]
+    assert_deterministic(
+        ctx,
+        lambda ctx, mod: _make_string_module(ctx, mod, b"deterministic\x00"),
+        lambda mod, rng: StringEncryptionPass(rng=rng).run_on_module(mod, ctx),
+        seed=88,
+    )
 
 
 def test_string_encryption_per_function_decryption(ctx, rng):
@@ -186,7 +164,7 @@ def test_string_encryption_per_function_decryption(ctx, rng):
         text = b"shared\x00"
         arr_ty = ctx.types.array(i8, len(text))
         gv = mod.add_global(arr_ty, "shared_str")
-        gv.initializer = llvm.const_array(i8, [i8.constant(b) for b in text])
+        gv.initializer = make_byte_array(ctx, text)
         gv.linkage = llvm.Linkage.Internal
         gv.set_constant(True)
 
@@ -211,9 +189,11 @@ def test_string_encryption_per_function_decryption(ctx, rng):
         assert changed
         assert mod.verify(), mod.get_verification_error()
 
-        ir = mod.to_string()
         # Should have per-function decryption — one se.copy per function
-        assert ir.count("se.copy") >= 2
+        for func in (func1, func2):
+            assert any(inst.name.startswith("se.copy")
+                       for bb in func.basic_blocks
+                       for inst in bb.instructions), func.name
 
 
 def test_string_encryption_linkonce_odr(ctx, rng):
@@ -226,7 +206,7 @@ def test_string_encryption_linkonce_odr(ctx, rng):
         text = b"linkonce string\x00"
         arr_ty = ctx.types.array(i8, len(text))
         gv = mod.add_global(arr_ty, "lo_str")
-        gv.initializer = llvm.const_array(i8, [i8.constant(b) for b in text])
+        gv.initializer = make_byte_array(ctx, text)
         gv.linkage = llvm.Linkage.LinkOnceODR
         gv.set_constant(True)
 
@@ -5,39 +5,31 @@ VirtualizationPass, and verifies:
 1. The pass returns changed=True (function was successfully virtualized)
 2. The bytecode global (@__vm_bytecode_*) was created
 3. The interpreter function (@__vm_interpret) exists
-4. The module passes verification (mod.verify())
+4. The module passes verification (assert_verified())
 """
 
 from __future__ import annotations
 
-import pytest
 import llvm
+import pytest
 
-from conftest import make_add_function, make_arith_function, make_branch_function
-
+from conftest import assert_verified
+from shifting_codes.passes import PassPipeline
 from shifting_codes.passes.substitution import SubstitutionPass
 from shifting_codes.passes.mba_obfuscation import MBAObfuscationPass
 from shifting_codes.passes.bogus_control_flow import BogusControlFlowPass
 from shifting_codes.passes.flattening import FlatteningPass
 from shifting_codes.passes.virtualization import VirtualizationPass
-from shifting_codes.utils.crypto import CryptoRandom
 
 
 def _has_bytecode_global(mod: llvm.Module, func_name: str) -> bool:
     """Check if bytecode global exists for a given function name."""
-    target = f"__vm_bytecode_{func_name}"
-    for gv in mod.globals:
-        if gv.name == target:
-            return True
-    return False
+    return mod.get_global(f"__vm_bytecode_{func_name}") is not None
 
 
 def _has_interpreter(mod: llvm.Module) -> bool:
     """Check if the VM interpreter function exists."""
-    for f in mod.functions:
-        if f.name == "__vm_interpret":
-            return True
-    return False
+    return mod.get_function("__vm_interpret") is not None
 
 
 def _has_vm_stub(func: llvm.Function) -> bool:
@@ -45,16 +37,13 @@ def _has_vm_stub(func: llvm.Function) -> bool:
 
     A stub calls @__vm_interpret and does NOT have the original logic.
     """
-    for bb in func.basic_blocks:
-        for inst in bb.instructions:
-            if inst.opcode == llvm.Opcode.Call:
-                try:
-                    callee = inst.called_value
-                    if callee.name == "__vm_interpret":
-                        return True
-                except (AttributeError, RuntimeError):
-                    pass
-    return False
+    interp = func.module.get_function("__vm_interpret")
+    if interp is None:
+        return False
+    return any(
+        user.is_call_inst and user.block.function == func
+        for user in interp.users
+    )
 
 
 def _apply_function_pass(pass_cls, func, ctx, rng):
@@ -71,9 +60,9 @@ def _apply_function_pass(pass_cls, func, ctx, rng):
 class TestSubstitutionThenVirtualization:
     """Substitution replaces binary ops with equivalent expressions."""
 
-    def test_add_function(self, ctx, rng):
-        with ctx.create_module("test") as mod:
-            func = make_add_function(ctx, mod)
+    def test_add_function(self, ctx, rng, add_ir):
+        with ctx.parse_ir(add_ir) as mod:
+            func = mod.get_function("add")
             _apply_function_pass(SubstitutionPass, func, ctx, rng)
             vm = VirtualizationPass(rng=rng)
             changed = vm.run_on_module(mod, ctx)
@@ -81,171 +70,138 @@ class TestSubstitutionThenVirtualization:
             assert _has_bytecode_global(mod, "add")
             assert _has_interpreter(mod)
             assert _has_vm_stub(func)
-            mod.verify()
+            assert_verified(mod)
 
-    def test_arith_function(self, ctx, rng):
-        with ctx.create_module("test") as mod:
-            func = make_arith_function(ctx, mod)
+    def test_arith_function(self, ctx, rng, arith_ir):
+        with ctx.parse_ir(arith_ir) as mod:
+            func = mod.get_function("arith")
             _apply_function_pass(SubstitutionPass, func, ctx, rng)
             vm = VirtualizationPass(rng=rng)
             changed = vm.run_on_module(mod, ctx)
             assert changed, "VirtualizationPass should virtualize after substitution"
             assert _has_bytecode_global(mod, "arith")
             assert _has_vm_stub(func)
-            mod.verify()
+            assert_verified(mod)
 
-    def test_branch_function(self, ctx, rng):
-        with ctx.create_module("test") as mod:
-            func = make_branch_function(ctx, mod)
+    def test_branch_function(self, ctx, rng, branch_ir):
+        with ctx.parse_ir(branch_ir) as mod:
+            func = mod.get_function("branch_func")
             _apply_function_pass(SubstitutionPass, func, ctx, rng)
             vm = VirtualizationPass(rng=rng)
             changed = vm.run_on_module(mod, ctx)
             assert changed, "VirtualizationPass should virtualize after substitution"
             assert _has_bytecode_global(mod, "branch_func")
             assert _has_vm_stub(func)
-            mod.verify()
+            assert_verified(mod)
 
 
 class TestFlatteningThenVirtualization:
     """Flattening converts control flow to switch-based dispatch."""
 
-    def test_branch_function(self, ctx, rng):
-        with ctx.create_module("test") as mod:
-            func = make_branch_function(ctx, mod)
+    def test_branch_function(self, ctx, rng, branch_ir):
+        with ctx.parse_ir(branch_ir) as mod:
+            func = mod.get_function("branch_func")
             _apply_function_pass(FlatteningPass, func, ctx, rng)
             vm = VirtualizationPass(rng=rng)
             changed = vm.run_on_module(mod, ctx)
             assert changed, "VirtualizationPass should virtualize after flattening"
             assert _has_bytecode_global(mod, "branch_func")
             assert _has_vm_stub(func)
-            mod.verify()
+            assert_verified(mod)
 
-    def test_add_function(self, ctx, rng):
-        with ctx.create_module("test") as mod:
-            func = make_add_function(ctx, mod)
+    def test_add_function(self, ctx, rng, add_ir):
+        with ctx.parse_ir(add_ir) as mod:
+            func = mod.get_function("add")
             _apply_function_pass(FlatteningPass, func, ctx, rng)
             vm = VirtualizationPass(rng=rng)
             changed = vm.run_on_module(mod, ctx)
             assert changed, "VirtualizationPass should virtualize after flattening"
             assert _has_bytecode_global(mod, "add")
             assert _has_vm_stub(func)
-            mod.verify()
+            assert_verified(mod)
 
 
 class TestBCFThenVirtualization:
     """Bogus Control Flow adds opaque predicates using URem."""
 
-    def test_add_function(self, ctx, rng):
-        with ctx.create_module("test") as mod:
-            func = make_add_function(ctx, mod)
+    def test_add_function(self, ctx, rng, add_ir):
+        with ctx.parse_ir(add_ir) as mod:
+            func = mod.get_function("add")
             _apply_function_pass(BogusControlFlowPass, func, ctx, rng)
             vm = VirtualizationPass(rng=rng)
             changed = vm.run_on_module(mod, ctx)
             assert changed, "VirtualizationPass should virtualize after BCF"
             assert _has_bytecode_global(mod, "add")
             assert _has_vm_stub(func)
-            mod.verify()
+            assert_verified(mod)
 
-    def test_branch_function(self, ctx, rng):
-        with ctx.create_module("test") as mod:
-            func = make_branch_function(ctx, mod)
+    def test_branch_function(self, ctx, rng, branch_ir):
+        with ctx.parse_ir(branch_ir) as mod:
+            func = mod.get_function("branch_func")
             _apply_function_pass(BogusControlFlowPass, func, ctx, rng)
             vm = VirtualizationPass(rng=rng)
             changed = vm.run_on_module(mod, ctx)
             assert changed, "VirtualizationPass should virtualize after BCF"
             assert _has_bytecode_global(mod, "branch_func")
             assert _has_vm_stub(func)
-            mod.verify()
+            assert_verified(mod)
 
 
 class TestMBAThenVirtualization:
     """MBA obfuscation expands binary ops into complex expressions."""
 
-    def test_add_function(self, ctx, rng):
-        with ctx.create_module("test") as mod:
-            func = make_add_function(ctx, mod)
+    def test_add_function(self, ctx, rng, add_ir):
+        with ctx.parse_ir(add_ir) as mod:
+            func = mod.get_function("add")
             _apply_function_pass(MBAObfuscationPass, func, ctx, rng)
             vm = VirtualizationPass(rng=rng)
             changed = vm.run_on_module(mod, ctx)
             assert changed, "VirtualizationPass should virtualize after MBA"
             assert _has_bytecode_global(mod, "add")
             assert _has_vm_stub(func)
-            mod.verify()
+            assert_verified(mod)
 
-    def test_arith_function(self, ctx, rng):
-        with ctx.create_module("test") as mod:
-            func = make_arith_function(ctx, mod)
+    def test_arith_function(self, ctx, rng, arith_ir):
+        with ctx.parse_ir(arith_ir) as mod:
+            func = mod.get_function("arith")
             _apply_function_pass(MBAObfuscationPass, func, ctx, rng)
             vm = VirtualizationPass(rng=rng)
             changed = vm.run_on_module(mod, ctx)
             assert changed, "VirtualizationPass should virtualize after MBA"
             assert _has_bytecode_global(mod, "arith")
             assert _has_vm_stub(func)
-            mod.verify()
+            assert_verified(mod)
 
 
-class TestCombinedPassesThenVirtualization:
-    """Multiple obfuscation passes applied before virtualization."""
-
-    def test_sub_then_flat_then_vm(self, ctx, rng):
-        with ctx.create_module("test") as mod:
-            func = make_branch_function(ctx, mod)
-            _apply_function_pass(SubstitutionPass, func, ctx, rng)
-            _apply_function_pass(FlatteningPass, func, ctx, rng)
-            vm = VirtualizationPass(rng=rng)
-            changed = vm.run_on_module(mod, ctx)
-            assert changed, "Should virtualize after Sub+Flat"
-            assert _has_bytecode_global(mod, "branch_func")
-            assert _has_vm_stub(func)
-            mod.verify()
-
-    def test_bcf_then_flat_then_vm(self, ctx, rng):
-        with ctx.create_module("test") as mod:
-            func = make_branch_function(ctx, mod)
-            _apply_function_pass(BogusControlFlowPass, func, ctx, rng)
-            _apply_function_pass(FlatteningPass, func, ctx, rng)
-            vm = VirtualizationPass(rng=rng)
-            changed = vm.run_on_module(mod, ctx)
-            assert changed, "Should virtualize after BCF+Flat"
-            assert _has_bytecode_global(mod, "branch_func")
-            assert _has_vm_stub(func)
-            mod.verify()
+# (IR fixture, function name, obfuscation passes applied before virtualization)
+_COMBINATIONS = [
+    pytest.param("branch_ir", "branch_func", [SubstitutionPass, FlatteningPass],
+                 id="sub+flat"),
+    pytest.param("branch_ir", "branch_func", [BogusControlFlowPass, FlatteningPass],
+                 id="bcf+flat"),
+    pytest.param("add_ir", "add", [SubstitutionPass, BogusControlFlowPass],
+                 id="sub+bcf"),
+    pytest.param("branch_ir", "branch_func", [MBAObfuscationPass, FlatteningPass],
+                 id="mba+flat"),
+    pytest.param("add_ir", "add", [SubstitutionPass, MBAObfuscationPass,
+                                   BogusControlFlowPass, FlatteningPass],
+                 id="all"),
+]
 
-    def test_sub_then_bcf_then_vm(self, ctx, rng):
-        with ctx.create_module("test") as mod:
-            func = make_add_function(ctx, mod)
-            _apply_function_pass(SubstitutionPass, func, ctx, rng)
-            _apply_function_pass(BogusControlFlowPass, func, ctx, rng)
-            vm = VirtualizationPass(rng=rng)
-            changed = vm.run_on_module(mod, ctx)
-            assert changed, "Should virtualize after Sub+BCF"
-            assert _has_bytecode_global(mod, "add")
-            assert _has_vm_stub(func)
-            mod.verify()
 
-    def test_mba_then_flat_then_vm(self, ctx, rng):
-        with ctx.create_module("test") as mod:
-            func = make_branch_function(ctx, mod)
-            _apply_function_pass(MBAObfuscationPass, func, ctx, rng)
-            _apply_function_pass(FlatteningPass, func, ctx, rng)
-            vm = VirtualizationPass(rng=rng)
-            changed = vm.run_on_module(mod, ctx)
-            assert changed, "Should virtualize after MBA+Flat"
-            assert _has_bytecode_global(mod, "branch_func")
-            assert _has_vm_stub(func)
-            mod.verify()
+class TestCombinedPassesThenVirtualization:
+    """Multiple obfuscation passes applied before virtualization."""
 
-    def test_all_passes_then_vm(self, ctx, rng):
-        """Sub + MBA + BCF + Flattening → Virtualization."""
-        with ctx.create_module("test") as mod:
-            func = make_add_function(ctx, mod)
-            _apply_function_pass(SubstitutionPass, func, ctx, rng)
-            _apply_function_pass(MBAObfuscationPass, func, ctx, rng)
-            _apply_function_pass(BogusControlFlowPass, func, ctx, rng)
-            _apply_function_pass(FlatteningPass, func, ctx, rng)
+    @pytest.mark.parametrize("ir_fixture, func_name, pass_classes", _COMBINATIONS)
+    def test_passes_then_vm(self, request, ctx, rng, ir_fixture, func_name,
+                            pass_classes):
+        with ctx.parse_ir(request.getfixturevalue(ir_fixture)) as mod:
+            func = mod.get_function(func_name)
+            pipeline = PassPipeline([cls(rng=rng) for cls in pass_classes])
+            pipeline.run(mod, ctx, selected_functions={func_name})
             vm = VirtualizationPass(rng=rng)
             changed = vm.run_on_module(mod, ctx)
-            assert changed, "Should virtualize after all passes"
-            assert _has_bytecode_global(mod, "add")
+            assert changed, f"Should virtualize after {request.node.callspec.id}"
+            assert _has_bytecode_global(mod, func_name)
             assert _has_vm_stub(func)
-            mod.verify()
+            assert_verified(mod)
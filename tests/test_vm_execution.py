@@ -3,14 +3,15 @@
 Tests that virtualized functions produce correct results when compiled
 and executed via ctypes. Covers:
 - Basic VM execution correctness
-- Obfuscation applied before virtualization (bytecode growth)
-- Obfuscation applied after virtualization (interpreter growth)
-- Combined before + after obfuscation
+- Obfuscation applied before and/or after virtualization (bytecode and
+  interpreter growth)
 """
 
+import atexit
 import ctypes
+import hashlib
+import itertools
 import os
-import platform
 import shutil
 import subprocess
 import tempfile
@@ -18,7 +19,10 @@ import tempfile
 import llvm
 import pytest
 
-from conftest import make_add_function, make_branch_function
+from conftest import (
+    CAN_EXECUTE, HAS_JIT, IS_WINDOWS, SHARED_EXT, TARGET_TRIPLE,
+    assert_verified, make_add_function, make_branch_function, target_machine,
+)
 
 from shifting_codes.passes.virtualization import VirtualizationPass
 from shifting_codes.passes.substitution import SubstitutionPass
@@ -33,42 +37,10 @@ from shifting_codes.utils.mba import clear_cache
 # Platform setup
 # ---------------------------------------------------------------------------
 
-_IS_WINDOWS = platform.system() == "Windows"
-_IS_MACOS = platform.system() == "Darwin"
-_MACHINE = platform.machine()
-
-if _IS_WINDOWS:
-    _TRIPLE = "x86_64-pc-windows-msvc"
-    _SHARED_EXT = ".dll"
-elif _IS_MACOS:
-    _arch = "arm64" if _MACHINE == "arm64" else "x86_64"
-    _TRIPLE = f"{_arch}-apple-darwin"
-    _SHARED_EXT = ".dylib"
-else:
-    _arch = "aarch64" if _MACHINE == "aarch64" else "x86_64"
-    _TRIPLE = f"{_arch}-unknown-linux-gnu"
-    _SHARED_EXT = ".so"
-
-
-def _can_compile():
-    """Check if clang is available for compilation."""
-    try:
-        result = subprocess.run(
-            ["clang", "--version"], capture_output=True, text=True, timeout=5
-        )
-        return result.returncode == 0
-    except (FileNotFoundError, subprocess.TimeoutExpired):
-        return False
-
-
-_HAS_CLANG = _can_compile()
-
-# Initialize LLVM targets once at module load
-llvm.initialize_all_targets()
-llvm.initialize_all_target_mcs()
-llvm.initialize_all_target_infos()
-llvm.initialize_all_asm_printers()
-llvm.initialize_all_asm_parsers()
+# Intermediate object files go to tmpfs where there is one. Linked libraries
+# stay in the default temp dir: /dev/shm is often mounted noexec, which would
+# make dlopen fail.
+_OBJ_TMP_DIR = "/dev/shm" if os.path.isdir("/dev/shm") else None
 
 
 # ---------------------------------------------------------------------------
@@ -80,475 +52,259 @@ def _emit_object(mod, func_name, label):
     """Emit module to object file. Returns (tmpdir, obj_path).
 
     Must be called while the module is still alive (inside its context manager).
-    Sets target triple and dllexport as needed.
+    Sets target triple and dllexport as needed. Requires the ``llvm_targets``
+    fixture, which ``_codegen_targets`` requests on this path.
     """
-    if _IS_WINDOWS:
-        for f in mod.functions:
-            if f.name == func_name:
-                f.dll_storage_class = llvm.DLLExport
-                break
-
-    mod.target_triple = _TRIPLE
-    target = llvm.get_target_from_triple(_TRIPLE)
-    reloc = llvm.RelocMode.PIC if not _IS_WINDOWS else llvm.RelocMode.Default
-    tm = llvm.create_target_machine(target, _TRIPLE, "generic", "",
-                                    reloc_mode=reloc)
-
-    tmpdir = tempfile.mkdtemp(prefix=f"vm_exec_{label}_")
+    if IS_WINDOWS:
+        mod.get_function(func_name).dll_storage_class = llvm.DLLExport
+
+    mod.target_triple = TARGET_TRIPLE
+    tmpdir = tempfile.mkdtemp(prefix=f"vm_exec_{label}_", dir=_OBJ_TMP_DIR)
     obj_path = os.path.join(tmpdir, f"{label}.o")
-    tm.emit_to_file(mod, obj_path, llvm.CodeGenFileType.ObjectFile)
+    target_machine().emit_to_file(mod, obj_path, llvm.CodeGenFileType.ObjectFile)
     return tmpdir, obj_path
 
 
-def _link_and_run(tmpdir, obj_path, func_name, argtypes, restype, args, label):
+# Shared libraries already linked and loaded in this process, keyed by a
+# digest of the object file they were linked from (the target triple is fixed
+# per process).
+_LIB_CACHE: dict[bytes, ctypes.CDLL] = {}
+_LIB_CACHE_DIR: str | None = None
+
+
+def _load_shared(obj_path):
+    """Link object file into a shared library and load it, reusing an identical
+    earlier one."""
+    global _LIB_CACHE_DIR
+    with open(obj_path, "rb") as f:
+        key = hashlib.blake2b(f.read(), digest_size=16).digest()
+    lib = _LIB_CACHE.get(key)
+    if lib is not None:
+        return lib
+
+    if _LIB_CACHE_DIR is None:
+        _LIB_CACHE_DIR = tempfile.mkdtemp(prefix="vm_exec_cache_")
+        atexit.register(shutil.rmtree, _LIB_CACHE_DIR, ignore_errors=True)
+    lib_path = os.path.join(_LIB_CACHE_DIR, f"{key.hex()}{SHARED_EXT}")
+    compile_cmd = ["clang", "-shared", "-O0", "-o", lib_path, obj_path]
+    if not IS_WINDOWS:
+        compile_cmd.insert(1, "-fPIC")
+    result = subprocess.run(
+        compile_cmd, capture_output=True, timeout=60
+    )
+    assert result.returncode == 0, (
+        f"Compilation failed: {result.stderr.decode(errors='replace')}"
+    )
+
+    lib = ctypes.CDLL(lib_path)
+    if IS_WINDOWS:
+        # Registered after the rmtree above, so atexit unloads the DLL first.
+        atexit.register(ctypes.windll.kernel32.FreeLibrary,
+                        ctypes.c_void_p(lib._handle))
+    _LIB_CACHE[key] = lib
+    return lib
+
+
+def _link_and_run(tmpdir, obj_path, func_name, argtypes, restype, args):
     """Link object file into shared library, load, call, return result."""
-    lib_path = os.path.join(tmpdir, f"{label}{_SHARED_EXT}")
-    lib_handle = None
-
     try:
-        compile_cmd = ["clang", "-shared", "-O0", "-o", lib_path, obj_path]
-        if not _IS_WINDOWS:
-            compile_cmd.insert(1, "-fPIC")
-        result = subprocess.run(
-            compile_cmd, capture_output=True, text=True, timeout=60
-        )
-        assert result.returncode == 0, f"Compilation failed: {result.stderr}"
-
-        lib = ctypes.CDLL(lib_path)
-        lib_handle = lib._handle
-        func = getattr(lib, func_name)
+        func = getattr(_load_shared(obj_path), func_name)
         func.argtypes = argtypes
         func.restype = restype
 
         return func(*args)
     finally:
-        if lib_handle is not None and _IS_WINDOWS:
-            ctypes.windll.kernel32.FreeLibrary(ctypes.c_void_p(lib_handle))
         shutil.rmtree(tmpdir, ignore_errors=True)
 
 
-def _get_bytecode_size(mod, func_name):
-    """Find __vm_bytecode_<func_name> global and return its array length."""
-    target_name = f"__vm_bytecode_{func_name}"
-    for gv in mod.globals:
-        if gv.name == target_name:
-            return gv.global_value_type.array_length
-    return 0
+def _jit_run(mod, func_name, argtypes, restype, args):
+    """JIT-compile module in-process, call the function, return result.
 
+    The JIT takes ownership of the module; the Python wrapper is invalid after.
+    """
+    with llvm.JIT.host() as jit:
+        jit.add_module(mod)
+        func = jit.ctypes_function(func_name, restype, argtypes)
+        return func(*args)
 
-def _count_function_instructions(mod, func_name):
-    """Count total instructions in a function."""
-    for f in mod.functions:
-        if f.name == func_name:
-            count = 0
-            for bb in f.basic_blocks:
-                for _ in bb.instructions:
-                    count += 1
-            return count
-    return 0
 
+def _execute(mod, func_name, label, argtypes, restype, args):
+    """Compile module, call the function, return result.
 
-# ---------------------------------------------------------------------------
-# Test class 1: Basic VM execution correctness
-# ---------------------------------------------------------------------------
+    Must be called while the module is still alive (inside its context manager)
+    and as the last use of it.
+    """
+    if HAS_JIT:
+        return _jit_run(mod, func_name, argtypes, restype, args)
+    tmpdir, obj_path = _emit_object(mod, func_name, label)
+    return _link_and_run(tmpdir, obj_path, func_name, argtypes, restype, args)
 
 
-@pytest.mark.skipif(not _HAS_CLANG, reason="clang not available")
-class TestVMExecution:
-    """Test that virtualized functions produce correct results."""
-
-    def test_add_execution(self):
-        with llvm.create_context() as ctx:
-            with ctx.create_module("test_vm") as mod:
-                make_add_function(ctx, mod)
-                rng = CryptoRandom(seed=42)
-                VirtualizationPass(rng=rng).run_on_module(mod, ctx)
-                assert mod.verify(), mod.get_verification_error()
-                tmpdir, obj_path = _emit_object(mod, "add", "add")
-
-        result = _link_and_run(
-            tmpdir, obj_path, "add",
-            [ctypes.c_int32, ctypes.c_int32], ctypes.c_int32,
-            (3, 5), "add"
-        )
-        assert result == 8
+def _get_bytecode_size(mod, func_name):
+    """Find __vm_bytecode_<func_name> global and return its array length."""
+    gv = mod.get_global(f"__vm_bytecode_{func_name}")
+    return gv.global_value_type.array_length if gv is not None else 0
 
-    def test_add_negative(self):
-        with llvm.create_context() as ctx:
-            with ctx.create_module("test_vm") as mod:
-                make_add_function(ctx, mod)
-                rng = CryptoRandom(seed=42)
-                VirtualizationPass(rng=rng).run_on_module(mod, ctx)
-                assert mod.verify(), mod.get_verification_error()
-                tmpdir, obj_path = _emit_object(mod, "add", "add_neg")
-
-        result = _link_and_run(
-            tmpdir, obj_path, "add",
-            [ctypes.c_int32, ctypes.c_int32], ctypes.c_int32,
-            (-1, 1), "add_neg"
-        )
-        assert result == 0
-
-    def test_branch_true_path(self):
-        with llvm.create_context() as ctx:
-            with ctx.create_module("test_vm") as mod:
-                make_branch_function(ctx, mod)
-                rng = CryptoRandom(seed=42)
-                VirtualizationPass(rng=rng).run_on_module(mod, ctx)
-                assert mod.verify(), mod.get_verification_error()
-                tmpdir, obj_path = _emit_object(mod, "branch_func", "branch_true")
-
-        result = _link_and_run(
-            tmpdir, obj_path, "branch_func",
-            [ctypes.c_int32, ctypes.c_int32], ctypes.c_int32,
-            (7, 3), "branch_true"
-        )
-        assert result == 10
 
-    def test_branch_false_path(self):
-        with llvm.create_context() as ctx:
-            with ctx.create_module("test_vm") as mod:
-                make_branch_function(ctx, mod)
-                rng = CryptoRandom(seed=42)
-                VirtualizationPass(rng=rng).run_on_module(mod, ctx)
-                assert mod.verify(), mod.get_verification_error()
-                tmpdir, obj_path = _emit_object(mod, "branch_func", "branch_false")
+def _count_function_instructions(mod, func_name):
+    """Count total instructions in a function."""
+    f = mod.get_function(func_name)
+    if f is None:
+        return 0
+    return sum(1 for bb in f.basic_blocks for _ in bb.instructions)
 
-        # a=2, b=5: 2 > 5 is false, so result = a - b = 2 - 5 = -3
-        result = _link_and_run(
-            tmpdir, obj_path, "branch_func",
-            [ctypes.c_int32, ctypes.c_int32], ctypes.c_int32,
-            (2, 5), "branch_false"
-        )
-        assert result == ctypes.c_int32(-3).value
 
+def _vm_baseline(ctx, make_function, func_name):
+    """Virtualize an unobfuscated function with seed 99.
 
-# ---------------------------------------------------------------------------
-# Test class 2: Obfuscation before VM (bytecode growth)
-# ---------------------------------------------------------------------------
+    Returns (bytecode size, __vm_interpret instruction count).
+    """
+    with ctx.create_module("baseline") as bmod:
+        make_function(ctx, bmod)
+        VirtualizationPass(rng=CryptoRandom(seed=99)).run_on_module(bmod, ctx)
+        return (_get_bytecode_size(bmod, func_name),
+                _count_function_instructions(bmod, "__vm_interpret"))
 
 
-@pytest.mark.skipif(not _HAS_CLANG, reason="clang not available")
-class TestObfuscationBeforeVM:
-    """Apply obfuscation passes to functions before virtualization.
+def _run_vm(make_function, func_name, args, pre_passes=(), post_passes=(),
+            seed=42):
+    """Obfuscate, virtualize, obfuscate the interpreter, then execute.
 
-    The obfuscated IR is more complex, producing larger bytecode.
-    Results must still be correct.
+    ``pre_passes`` run on every defined function before VirtualizationPass,
+    ``post_passes`` on @__vm_interpret after it. The function takes and
+    returns i32. Returns (result, bytecode size, interpreter instruction count).
     """
-
-    def test_substitution_before_vm(self):
-        with llvm.create_context() as ctx:
-            # Get baseline bytecode size
-            with ctx.create_module("baseline") as bmod:
-                make_add_function(ctx, bmod)
-                VirtualizationPass(rng=CryptoRandom(seed=99)).run_on_module(bmod, ctx)
-                baseline = _get_bytecode_size(bmod, "add")
-
-            with ctx.create_module("test_vm") as mod:
-                make_add_function(ctx, mod)
-                rng = CryptoRandom(seed=42)
+    # MBA caches solved coefficients per process; start every run from the
+    # same state so results do not depend on test order.
+    clear_cache()
+    with llvm.create_context() as ctx:
+        with ctx.create_module("test_vm") as mod:
+            make_function(ctx, mod)
+            rng = CryptoRandom(seed=seed)
+            for pass_cls in pre_passes:
                 for f in mod.functions:
                     if not f.is_declaration:
-                        SubstitutionPass(rng=rng).run_on_function(f, ctx)
-                assert mod.verify(), mod.get_verification_error()
-                VirtualizationPass(rng=rng).run_on_module(mod, ctx)
-                assert mod.verify(), mod.get_verification_error()
-
-                new_size = _get_bytecode_size(mod, "add")
-                assert new_size > baseline, (
-                    f"Bytecode should grow: {new_size} <= {baseline}"
-                )
-                tmpdir, obj_path = _emit_object(mod, "add", "sub_before_vm")
-
-        result = _link_and_run(
-            tmpdir, obj_path, "add",
-            [ctypes.c_int32, ctypes.c_int32], ctypes.c_int32,
-            (3, 5), "sub_before_vm"
-        )
-        assert result == 8
+                        pass_cls(rng=rng).run_on_function(f, ctx)
+                assert_verified(mod)
 
-    def test_mba_before_vm(self):
-        clear_cache()
-        with llvm.create_context() as ctx:
-            with ctx.create_module("baseline") as bmod:
-                make_add_function(ctx, bmod)
-                VirtualizationPass(rng=CryptoRandom(seed=99)).run_on_module(bmod, ctx)
-                baseline = _get_bytecode_size(bmod, "add")
-
-            with ctx.create_module("test_vm") as mod:
-                make_add_function(ctx, mod)
-                rng = CryptoRandom(seed=42)
-                for f in mod.functions:
-                    if not f.is_declaration:
-                        MBAObfuscationPass(rng=rng).run_on_function(f, ctx)
-                assert mod.verify(), mod.get_verification_error()
-                VirtualizationPass(rng=rng).run_on_module(mod, ctx)
-                assert mod.verify(), mod.get_verification_error()
-
-                new_size = _get_bytecode_size(mod, "add")
-                assert new_size > baseline, (
-                    f"Bytecode should grow: {new_size} <= {baseline}"
-                )
-                tmpdir, obj_path = _emit_object(mod, "add", "mba_before_vm")
-
-        result = _link_and_run(
-            tmpdir, obj_path, "add",
-            [ctypes.c_int32, ctypes.c_int32], ctypes.c_int32,
-            (3, 5), "mba_before_vm"
-        )
-        assert result == 8
-
-    def test_bcf_before_vm(self):
-        with llvm.create_context() as ctx:
-            with ctx.create_module("baseline") as bmod:
-                make_add_function(ctx, bmod)
-                VirtualizationPass(rng=CryptoRandom(seed=99)).run_on_module(bmod, ctx)
-                baseline = _get_bytecode_size(bmod, "add")
+            VirtualizationPass(rng=rng).run_on_module(mod, ctx)
 
-            with ctx.create_module("test_vm") as mod:
-                make_add_function(ctx, mod)
-                rng = CryptoRandom(seed=42)
-                for f in mod.functions:
-                    if not f.is_declaration:
-                        BogusControlFlowPass(rng=rng).run_on_function(f, ctx)
-                assert mod.verify(), mod.get_verification_error()
-                VirtualizationPass(rng=rng).run_on_module(mod, ctx)
-                assert mod.verify(), mod.get_verification_error()
-
-                new_size = _get_bytecode_size(mod, "add")
-                assert new_size > baseline, (
-                    f"Bytecode should grow: {new_size} <= {baseline}"
-                )
-                tmpdir, obj_path = _emit_object(mod, "add", "bcf_before_vm")
-
-        result = _link_and_run(
-            tmpdir, obj_path, "add",
-            [ctypes.c_int32, ctypes.c_int32], ctypes.c_int32,
-            (3, 5), "bcf_before_vm"
-        )
-        assert result == 8
+            for pass_cls in post_passes:
+                assert_verified(mod)
+                pass_cls(rng=rng).run_on_function(
+                    mod.get_function("__vm_interpret"), ctx)
+            # Codegen on invalid IR can crash the process, so this check
+            # stays on under --skip-verify.
+            assert mod.verify(), mod.get_verification_error()
 
-    def test_flattening_before_vm(self):
-        # Use branch_func (4 blocks) since flattening skips single-block functions
-        with llvm.create_context() as ctx:
-            with ctx.create_module("baseline") as bmod:
-                make_branch_function(ctx, bmod)
-                VirtualizationPass(rng=CryptoRandom(seed=99)).run_on_module(bmod, ctx)
-                baseline = _get_bytecode_size(bmod, "branch_func")
-
-            with ctx.create_module("test_vm") as mod:
-                make_branch_function(ctx, mod)
-                rng = CryptoRandom(seed=42)
-                for f in mod.functions:
-                    if not f.is_declaration:
-                        FlatteningPass(rng=rng).run_on_function(f, ctx)
-                assert mod.verify(), mod.get_verification_error()
-                VirtualizationPass(rng=rng).run_on_module(mod, ctx)
-                assert mod.verify(), mod.get_verification_error()
-
-                new_size = _get_bytecode_size(mod, "branch_func")
-                assert new_size > baseline, (
-                    f"Bytecode should grow: {new_size} <= {baseline}"
-                )
-                tmpdir, obj_path = _emit_object(mod, "branch_func", "flat_before_vm")
-
-        result = _link_and_run(
-            tmpdir, obj_path, "branch_func",
-            [ctypes.c_int32, ctypes.c_int32], ctypes.c_int32,
-            (7, 3), "flat_before_vm"
-        )
-        assert result == 10
+            bytecode_size = _get_bytecode_size(mod, func_name)
+            interp_size = _count_function_instructions(mod, "__vm_interpret")
+            result = _execute(
+                mod, func_name, func_name,
+                [ctypes.c_int32, ctypes.c_int32], ctypes.c_int32, args,
+            )
+    return result, bytecode_size, interp_size
 
 
-# ---------------------------------------------------------------------------
-# Test class 3: Obfuscation after VM (interpreter growth)
-# ---------------------------------------------------------------------------
+@pytest.fixture(scope="module", autouse=True)
+def _codegen_targets(request):
+    """Initialize the LLVM backends only when the clang fallback emits objects."""
+    if not HAS_JIT:
+        request.getfixturevalue("llvm_targets")
 
 
-@pytest.mark.skipif(not _HAS_CLANG, reason="clang not available")
-class TestObfuscationAfterVM:
-    """Apply obfuscation passes after virtualization.
+@pytest.fixture(scope="module")
+def add_baseline(ctx):
+    """Baseline sizes for a plain virtualized add, computed once per module."""
+    return _vm_baseline(ctx, make_add_function, "add")
 
-    The passes transform __vm_interpret, making it larger but functionally
-    equivalent. Results must still be correct.
-    """
 
-    def test_substitution_after_vm(self):
-        with llvm.create_context() as ctx:
-            # Get baseline interpreter size
-            with ctx.create_module("baseline") as bmod:
-                make_add_function(ctx, bmod)
-                VirtualizationPass(rng=CryptoRandom(seed=99)).run_on_module(bmod, ctx)
-                baseline = _count_function_instructions(bmod, "__vm_interpret")
+@pytest.fixture(scope="module")
+def branch_baseline(ctx):
+    """Baseline sizes for a plain virtualized branch_func, computed once per module."""
+    return _vm_baseline(ctx, make_branch_function, "branch_func")
 
-            with ctx.create_module("test_vm") as mod:
-                make_add_function(ctx, mod)
-                rng = CryptoRandom(seed=42)
-                VirtualizationPass(rng=rng).run_on_module(mod, ctx)
-                assert mod.verify(), mod.get_verification_error()
 
-                for f in mod.functions:
-                    if f.name == "__vm_interpret":
-                        SubstitutionPass(rng=rng).run_on_function(f, ctx)
-                        break
-                assert mod.verify(), mod.get_verification_error()
-
-                new_count = _count_function_instructions(mod, "__vm_interpret")
-                assert new_count > baseline, (
-                    f"Interpreter should grow: {new_count} <= {baseline}"
-                )
-                tmpdir, obj_path = _emit_object(mod, "add", "sub_after_vm")
-
-        result = _link_and_run(
-            tmpdir, obj_path, "add",
-            [ctypes.c_int32, ctypes.c_int32], ctypes.c_int32,
-            (3, 5), "sub_after_vm"
-        )
-        assert result == 8
+# ---------------------------------------------------------------------------
+# Test class 1: Basic VM execution correctness
+# ---------------------------------------------------------------------------
 
-    def test_flattening_after_vm(self):
-        with llvm.create_context() as ctx:
-            with ctx.create_module("baseline") as bmod:
-                make_add_function(ctx, bmod)
-                VirtualizationPass(rng=CryptoRandom(seed=99)).run_on_module(bmod, ctx)
-                baseline = _count_function_instructions(bmod, "__vm_interpret")
 
-            with ctx.create_module("test_vm") as mod:
-                make_add_function(ctx, mod)
-                rng = CryptoRandom(seed=42)
-                VirtualizationPass(rng=rng).run_on_module(mod, ctx)
-                assert mod.verify(), mod.get_verification_error()
+@pytest.mark.skipif(not CAN_EXECUTE, reason="neither JIT nor clang available")
+class TestVMExecution:
+    """Test that virtualized functions produce correct results."""
 
-                for f in mod.functions:
-                    if f.name == "__vm_interpret":
-                        FlatteningPass(rng=rng).run_on_function(f, ctx)
-                        break
-                assert mod.verify(), mod.get_verification_error()
-
-                new_count = _count_function_instructions(mod, "__vm_interpret")
-                assert new_count > baseline, (
-                    f"Interpreter should grow: {new_count} <= {baseline}"
-                )
-                tmpdir, obj_path = _emit_object(mod, "add", "flat_after_vm")
-
-        result = _link_and_run(
-            tmpdir, obj_path, "add",
-            [ctypes.c_int32, ctypes.c_int32], ctypes.c_int32,
-            (3, 5), "flat_after_vm"
-        )
-        assert result == 8
+    @pytest.mark.parametrize("make_function, func_name, args, expected", [
+        pytest.param(make_add_function, "add", (3, 5), 8, id="add"),
+        pytest.param(make_add_function, "add", (-1, 1), 0, id="add_negative"),
+        pytest.param(make_branch_function, "branch_func", (7, 3), 10,
+                     id="branch_true_path"),
+        # a=2, b=5: 2 > 5 is false, so result = a - b = 2 - 5 = -3
+        pytest.param(make_branch_function, "branch_func", (2, 5), -3,
+                     id="branch_false_path"),
+    ])
+    def test_execution(self, make_function, func_name, args, expected):
+        result, _, _ = _run_vm(make_function, func_name, args)
+        assert result == expected
 
 
 # ---------------------------------------------------------------------------
-# Test class 4: Obfuscation both before and after VM
+# Test class 2: Obfuscation before and/or after VM
 # ---------------------------------------------------------------------------
 
-
-@pytest.mark.skipif(not _HAS_CLANG, reason="clang not available")
-class TestObfuscationBothBeforeAndAfterVM:
-    """Apply obfuscation before AND after virtualization.
-
-    Pre-VM obfuscation grows bytecode; post-VM obfuscation grows the
-    interpreter. Both effects combine. Results must still be correct.
+_PRE_PASSES = {
+    "none": None,
+    "sub": SubstitutionPass,
+    "mba": MBAObfuscationPass,
+    "bcf": BogusControlFlowPass,
+}
+_POST_PASSES = {
+    "none": None,
+    "sub": SubstitutionPass,
+    "flat": FlatteningPass,
+}
+# Every (pre, post) pair except plain virtualization, which TestVMExecution covers.
+_PRE_POST_CASES = [
+    pytest.param(pre, post, id=f"{pre_id}_before_{post_id}_after")
+    for (pre_id, pre), (post_id, post) in itertools.product(
+        _PRE_PASSES.items(), _POST_PASSES.items())
+    if pre is not None or post is not None
+]
+
+
+@pytest.mark.skipif(not CAN_EXECUTE, reason="neither JIT nor clang available")
+class TestObfuscationAroundVM:
+    """Apply obfuscation before and/or after virtualization.
+
+    Pre-VM obfuscation makes the IR more complex, producing larger bytecode;
+    post-VM obfuscation transforms __vm_interpret, making it larger but
+    functionally equivalent. Results must still be correct.
     """
 
-    def test_sub_before_flat_after(self):
-        with llvm.create_context() as ctx:
-            # Get baselines
-            with ctx.create_module("baseline") as bmod:
-                make_add_function(ctx, bmod)
-                VirtualizationPass(rng=CryptoRandom(seed=99)).run_on_module(bmod, ctx)
-                baseline_bc = _get_bytecode_size(bmod, "add")
-                baseline_interp = _count_function_instructions(
-                    bmod, "__vm_interpret"
-                )
-
-            with ctx.create_module("test_vm") as mod:
-                make_add_function(ctx, mod)
-                rng = CryptoRandom(seed=42)
-
-                # Pre-VM: substitution on add
-                for f in mod.functions:
-                    if not f.is_declaration:
-                        SubstitutionPass(rng=rng).run_on_function(f, ctx)
-                assert mod.verify(), mod.get_verification_error()
-
-                # VM
-                VirtualizationPass(rng=rng).run_on_module(mod, ctx)
-                assert mod.verify(), mod.get_verification_error()
-
-                # Post-VM: flattening on __vm_interpret
-                for f in mod.functions:
-                    if f.name == "__vm_interpret":
-                        FlatteningPass(rng=rng).run_on_function(f, ctx)
-                        break
-                assert mod.verify(), mod.get_verification_error()
-
-                # Verify growth
-                new_bc = _get_bytecode_size(mod, "add")
-                new_interp = _count_function_instructions(mod, "__vm_interpret")
-                assert new_bc > baseline_bc, (
-                    f"Bytecode should grow: {new_bc} <= {baseline_bc}"
-                )
-                assert new_interp > baseline_interp, (
-                    f"Interpreter should grow: {new_interp} <= {baseline_interp}"
-                )
-                tmpdir, obj_path = _emit_object(mod, "add", "sub_flat_both")
-
-        result = _link_and_run(
-            tmpdir, obj_path, "add",
-            [ctypes.c_int32, ctypes.c_int32], ctypes.c_int32,
-            (3, 5), "sub_flat_both"
+    @pytest.mark.parametrize("pre_pass, post_pass", _PRE_POST_CASES)
+    def test_obfuscation_around_vm(self, add_baseline, pre_pass, post_pass):
+        baseline_bc, baseline_interp = add_baseline
+        result, new_bc, new_interp = _run_vm(
+            make_add_function, "add", (3, 5),
+            pre_passes=[pre_pass] if pre_pass else [],
+            post_passes=[post_pass] if post_pass else [],
         )
+        if pre_pass is not None:
+            assert new_bc > baseline_bc, (
+                f"Bytecode should grow: {new_bc} <= {baseline_bc}"
+            )
+        if post_pass is not None:
+            assert new_interp > baseline_interp, (
+                f"Interpreter should grow: {new_interp} <= {baseline_interp}"
+            )
         assert result == 8
 
-    def test_mba_before_sub_after(self):
-        clear_cache()
-        with llvm.create_context() as ctx:
-            # Get baselines
-            with ctx.create_module("baseline") as bmod:
-                make_add_function(ctx, bmod)
-                VirtualizationPass(rng=CryptoRandom(seed=99)).run_on_module(bmod, ctx)
-                baseline_bc = _get_bytecode_size(bmod, "add")
-                baseline_interp = _count_function_instructions(
-                    bmod, "__vm_interpret"
-                )
-
-            with ctx.create_module("test_vm") as mod:
-                make_add_function(ctx, mod)
-                rng = CryptoRandom(seed=42)
-
-                # Pre-VM: MBA on add
-                for f in mod.functions:
-                    if not f.is_declaration:
-                        MBAObfuscationPass(rng=rng).run_on_function(f, ctx)
-                assert mod.verify(), mod.get_verification_error()
-
-                # VM
-                VirtualizationPass(rng=rng).run_on_module(mod, ctx)
-                assert mod.verify(), mod.get_verification_error()
-
-                # Post-VM: substitution on __vm_interpret
-                for f in mod.functions:
-                    if f.name == "__vm_interpret":
-                        SubstitutionPass(rng=rng).run_on_function(f, ctx)
-                        break
-                assert mod.verify(), mod.get_verification_error()
-
-                # Verify growth
-                new_bc = _get_bytecode_size(mod, "add")
-                new_interp = _count_function_instructions(mod, "__vm_interpret")
-                assert new_bc > baseline_bc, (
-                    f"Bytecode should grow: {new_bc} <= {baseline_bc}"
-                )
-                assert new_interp > baseline_interp, (
-                    f"Interpreter should grow: {new_interp} <= {baseline_interp}"
-                )
-                tmpdir, obj_path = _emit_object(mod, "add", "mba_sub_both")
-
-        result = _link_and_run(
-            tmpdir, obj_path, "add",
-            [ctypes.c_int32, ctypes.c_int32], ctypes.c_int32,
-            (3, 5), "mba_sub_both"
+    def test_flattening_before_vm(self, branch_baseline):
+        # branch_func (4 blocks) since flattening skips single-block functions
+        baseline, _ = branch_baseline
+        result, new_size, _ = _run_vm(make_branch_function, "branch_func", (7, 3),
+                                      pre_passes=[FlatteningPass])
+        assert new_size > baseline, (
+            f"Bytecode should grow: {new_size} <= {baseline}"
         )
-        assert result == 8
+        assert result == 10
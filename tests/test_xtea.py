@@ -4,18 +4,21 @@ Tests:
 1. Build XTEA IR and verify module
 2. Apply each pass individually and verify
 3. Apply all passes in sequence and verify
-4. (Optional) Compile and execute via ctypes for correctness check
+4. (Optional) JIT or compile and execute via ctypes for correctness check
 """
 
 import ctypes
-import os
-import platform
+import random
 import subprocess
-import tempfile
 
 import llvm
 import pytest
 
+from conftest import (
+    CAN_EXECUTE, HAS_JIT, IS_WINDOWS, SHARED_EXT, TARGET_TRIPLE,
+    module_fingerprint, target_machine,
+)
+
 from shifting_codes.passes import PassPipeline
 from shifting_codes.passes.substitution import SubstitutionPass
 from shifting_codes.passes.mba_obfuscation import MBAObfuscationPass
@@ -29,16 +32,23 @@ from shifting_codes.xtea.builder import build_xtea_encrypt
 from shifting_codes.xtea.reference import xtea_encrypt
 
 
-def test_xtea_build_and_verify():
+@pytest.fixture(scope="module")
+def xtea_ir(ctx):
+    """IR text of a build_xtea_encrypt() module, built once."""
+    with ctx.create_module("xtea") as mod:
+        build_xtea_encrypt(ctx, mod)
+        return mod.to_string()
+
+
+def test_xtea_build_and_verify(ctx):
     """Build XTEA IR and verify the module."""
-    with llvm.create_context() as ctx:
-        with ctx.create_module("xtea") as mod:
-            build_xtea_encrypt(ctx, mod)
-            assert mod.verify(), mod.get_verification_error()
+    with ctx.create_module("xtea") as mod:
+        build_xtea_encrypt(ctx, mod)
+        assert mod.verify(), mod.get_verification_error()
 
-            ir_text = mod.to_string()
-            assert "xtea_encrypt" in ir_text
-            assert "loop.body" in ir_text
+        ir_text = mod.to_string()
+        assert "xtea_encrypt" in ir_text
+        assert "loop.body" in ir_text
 
 
 def test_xtea_reference_known_vector():
@@ -63,99 +73,130 @@ def test_xtea_reference_roundtrip():
     assert (d0, d1) == (v0, v1)
 
 
-def test_xtea_with_substitution():
-    """Apply substitution pass to XTEA IR and verify."""
-    with llvm.create_context() as ctx:
-        with ctx.create_module("xtea") as mod:
-            build_xtea_encrypt(ctx, mod)
-            rng = CryptoRandom(seed=42)
-            p = SubstitutionPass(rng=rng)
-            for func in mod.functions:
-                if not func.is_declaration:
-                    p.run_on_function(func, ctx)
-            assert mod.verify(), mod.get_verification_error()
+def test_xtea_reference_roundtrip_random():
+    """Encrypt then decrypt round-trips for many seeded random blocks and keys."""
+    from shifting_codes.xtea.reference import xtea_decrypt
+
+    rand = random.Random(0)
+    for _ in range(256):
+        key = [rand.getrandbits(32) for _ in range(4)]
+        v0, v1 = rand.getrandbits(32), rand.getrandbits(32)
+        rounds = rand.randrange(1, 65)
+
+        c0, c1 = xtea_encrypt(v0, v1, key, rounds)
+        assert xtea_decrypt(c0, c1, key, rounds) == (v0, v1), (
+            f"roundtrip failed for v=({v0:#x}, {v1:#x}) key={key} rounds={rounds}"
+        )
 
 
-def test_xtea_with_mba():
-    """Apply MBA pass to XTEA IR and verify."""
+@pytest.mark.parametrize("pass_cls", [
+    pytest.param(SubstitutionPass, id="substitution"),
+    pytest.param(MBAObfuscationPass, id="mba"),
+    pytest.param(BogusControlFlowPass, id="bogus_control_flow"),
+    pytest.param(FlatteningPass, id="flattening"),
+])
+def test_xtea_with_pass(ctx, xtea_ir, pass_cls):
+    """Apply a single pass to XTEA IR and verify."""
     clear_cache()
-    with llvm.create_context() as ctx:
-        with ctx.create_module("xtea") as mod:
-            build_xtea_encrypt(ctx, mod)
-            rng = CryptoRandom(seed=42)
-            p = MBAObfuscationPass(rng=rng)
-            for func in mod.functions:
-                if not func.is_declaration:
-                    p.run_on_function(func, ctx)
-            assert mod.verify(), mod.get_verification_error()
-
-
-def test_xtea_with_bogus_control_flow():
-    """Apply BCF pass to XTEA IR and verify."""
-    with llvm.create_context() as ctx:
-        with ctx.create_module("xtea") as mod:
-            build_xtea_encrypt(ctx, mod)
-            rng = CryptoRandom(seed=42)
-            p = BogusControlFlowPass(rng=rng)
-            for func in mod.functions:
-                if not func.is_declaration:
-                    p.run_on_function(func, ctx)
-            assert mod.verify(), mod.get_verification_error()
-
-
-def test_xtea_with_flattening():
-    """Apply flattening pass to XTEA IR and verify."""
-    with llvm.create_context() as ctx:
-        with ctx.create_module("xtea") as mod:
-            build_xtea_encrypt(ctx, mod)
-            rng = CryptoRandom(seed=42)
-            p = FlatteningPass(rng=rng)
-            for func in mod.functions:
-                if not func.is_declaration:
-                    p.run_on_function(func, ctx)
-            assert mod.verify(), mod.get_verification_error()
-
-
-def test_xtea_full_pipeline():
+    with ctx.parse_ir(xtea_ir) as mod:
+        p = pass_cls(rng=CryptoRandom(seed=42))
+        p.run_on_module(mod, ctx)
+        assert mod.verify(), mod.get_verification_error()
+
+
+def test_xtea_full_pipeline(ctx, xtea_ir):
     """Apply all 6 passes in sequence and verify module."""
     clear_cache()
-    with llvm.create_context() as ctx:
-        with ctx.create_module("xtea") as mod:
-            build_xtea_encrypt(ctx, mod)
-            original_ir = mod.to_string()
-
-            pipeline = PassPipeline([
-                SubstitutionPass(rng=CryptoRandom(seed=1)),
-                MBAObfuscationPass(rng=CryptoRandom(seed=2)),
-                BogusControlFlowPass(rng=CryptoRandom(seed=3)),
-                FlatteningPass(rng=CryptoRandom(seed=4)),
-                GlobalEncryptionPass(rng=CryptoRandom(seed=5)),
-                IndirectCallPass(rng=CryptoRandom(seed=6)),
-            ])
-
-            pipeline.run(mod, ctx)
-            assert mod.verify(), mod.get_verification_error()
-
-            new_ir = mod.to_string()
-            assert new_ir != original_ir
-            # IR should be significantly larger after obfuscation
-            assert len(new_ir) > len(original_ir)
-
-
-def _can_compile():
-    """Check if we have clang and can compile."""
+    with ctx.parse_ir(xtea_ir) as mod:
+        original_fp = module_fingerprint(mod)
+
+        pipeline = PassPipeline([
+            SubstitutionPass(rng=CryptoRandom(seed=1)),
+            MBAObfuscationPass(rng=CryptoRandom(seed=2)),
+            BogusControlFlowPass(rng=CryptoRandom(seed=3)),
+            FlatteningPass(rng=CryptoRandom(seed=4)),
+            GlobalEncryptionPass(rng=CryptoRandom(seed=5)),
+            IndirectCallPass(rng=CryptoRandom(seed=6)),
+        ])
+
+        pipeline.run(mod, ctx)
+        assert mod.verify(), mod.get_verification_error()
+
+        new_fp = module_fingerprint(mod)
+        assert new_fp != original_fp
+        # Obfuscation should grow the instruction count
+        *_, original_insts = original_fp
+        *_, new_insts = new_fp
+        assert new_insts > original_insts
+
+
+# void xtea_encrypt(uint32_t v[2], const uint32_t key[4], int32_t rounds)
+_XTEA_ARGTYPES = [
+    ctypes.POINTER(ctypes.c_uint32),
+    ctypes.POINTER(ctypes.c_uint32),
+    ctypes.c_int32,
+]
+_XTEA_PROTO = ctypes.CFUNCTYPE(None, *_XTEA_ARGTYPES)
+
+
+def _jit_xtea(ctx, ir_text, v_buf, key_buf, rounds):
+    """Run xtea_encrypt in-process through the ORC JIT."""
+    with ctx.parse_ir(ir_text) as mod:
+        assert mod.verify(), mod.get_verification_error()
+        with llvm.JIT.host() as jit:
+            jit.add_module(mod)
+            # ctypes_function() has no void return, so wrap the address directly
+            func = _XTEA_PROTO(jit.lookup("xtea_encrypt"))
+            func(v_buf, key_buf, rounds)
+
+
+def _link_xtea(ctx, ir_text, tmp_path, v_buf, key_buf, rounds):
+    """Emit an object, link it into a shared library with clang, and call it.
+
+    Requires the ``llvm_targets`` fixture to have initialized the backends.
+    """
+    obj_path = str(tmp_path / "xtea.o")
+    lib_path = str(tmp_path / f"xtea{SHARED_EXT}")
+
+    with ctx.parse_ir(ir_text) as mod:
+        xtea_func = mod.get_function("xtea_encrypt")
+
+        # On Windows, mark function as dllexport
+        if IS_WINDOWS:
+            xtea_func.dll_storage_class = llvm.DLLExport
+
+        assert mod.verify()
+        mod.target_triple = TARGET_TRIPLE
+
+        target_machine().emit_to_file(mod, obj_path, llvm.CodeGenFileType.ObjectFile)
+
+    # Compile to shared library
+    compile_cmd = ["clang", "-shared", "-o", lib_path, obj_path]
+    if not IS_WINDOWS:
+        compile_cmd.insert(1, "-fPIC")
+    compile_result = subprocess.run(
+        compile_cmd, capture_output=True, timeout=30
+    )
+    assert compile_result.returncode == 0, (
+        f"Compilation failed: {compile_result.stderr.decode(errors='replace')}"
+    )
+
+    # Load and call
+    lib = ctypes.CDLL(lib_path)
     try:
-        result = subprocess.run(
-            ["clang", "--version"], capture_output=True, text=True, timeout=5
-        )
-        return result.returncode == 0
-    except (FileNotFoundError, subprocess.TimeoutExpired):
-        return False
+        func = lib.xtea_encrypt
+        func.argtypes = _XTEA_ARGTYPES
+        func.restype = None
+        func(v_buf, key_buf, rounds)
+    finally:
+        # Unload the DLL on Windows so pytest can later remove tmp_path
+        if IS_WINDOWS:
+            ctypes.windll.kernel32.FreeLibrary(ctypes.c_void_p(lib._handle))
 
 
-@pytest.mark.skipif(not _can_compile(), reason="clang not available")
-def test_xtea_execution_correctness():
-    """Build XTEA IR -> emit object -> compile -> load -> execute -> compare with reference."""
+@pytest.mark.skipif(not CAN_EXECUTE, reason="neither JIT nor clang available")
+def test_xtea_execution_correctness(request, ctx, xtea_ir, tmp_path):
+    """Execute the XTEA IR natively and compare with the Python reference."""
     key = [0x01234567, 0x89ABCDEF, 0xFEDCBA98, 0x76543210]
     v0_in, v1_in = 0xDEADBEEF, 0xCAFEBABE
     rounds = 32
@@ -163,83 +204,13 @@ def test_xtea_execution_correctness():
     # Get reference result
     ref_v0, ref_v1 = xtea_encrypt(v0_in, v1_in, key, rounds)
 
-    # Initialize LLVM targets
-    llvm.initialize_all_targets()
-    llvm.initialize_all_target_mcs()
-    llvm.initialize_all_target_infos()
-    llvm.initialize_all_asm_printers()
-    llvm.initialize_all_asm_parsers()
-
-    # Determine target triple
-    is_windows = platform.system() == "Windows"
-    is_macos = platform.system() == "Darwin"
-    machine = platform.machine()
-    if is_windows:
-        triple = "x86_64-pc-windows-msvc"
-        shared_ext = ".dll"
-    elif is_macos:
-        arch = "arm64" if machine == "arm64" else "x86_64"
-        triple = f"{arch}-apple-darwin"
-        shared_ext = ".dylib"
+    v_buf = (ctypes.c_uint32 * 2)(v0_in, v1_in)
+    key_buf = (ctypes.c_uint32 * 4)(*key)
+    if HAS_JIT:
+        _jit_xtea(ctx, xtea_ir, v_buf, key_buf, rounds)
     else:
-        arch = "aarch64" if machine == "aarch64" else "x86_64"
-        triple = f"{arch}-unknown-linux-gnu"
-        shared_ext = ".so"
-
-    tmpdir = tempfile.mkdtemp()
-    obj_path = os.path.join(tmpdir, "xtea.o")
-    lib_path = os.path.join(tmpdir, f"xtea{shared_ext}")
-    lib_handle = None
-
-    try:
-        with llvm.create_context() as ctx:
-            with ctx.create_module("xtea") as mod:
-                xtea_func = build_xtea_encrypt(ctx, mod)
-
-                # On Windows, mark function as dllexport
-                if is_windows:
-                    xtea_func.dll_storage_class = llvm.DLLExport
-
-                assert mod.verify()
-                mod.target_triple = triple
-
-                target = llvm.get_target_from_triple(triple)
-                reloc = llvm.RelocMode.PIC if not is_windows else llvm.RelocMode.Default
-                tm = llvm.create_target_machine(target, triple, "generic", "",
-                                                reloc_mode=reloc)
-                tm.emit_to_file(mod, obj_path, llvm.CodeGenFileType.ObjectFile)
-
-        # Compile to shared library
-        compile_cmd = ["clang", "-shared", "-o", lib_path, obj_path]
-        if not is_windows:
-            compile_cmd.insert(1, "-fPIC")
-        compile_result = subprocess.run(
-            compile_cmd, capture_output=True, text=True, timeout=30
-        )
-        assert compile_result.returncode == 0, (
-            f"Compilation failed: {compile_result.stderr}"
-        )
+        request.getfixturevalue("llvm_targets")
+        _link_xtea(ctx, xtea_ir, tmp_path, v_buf, key_buf, rounds)
 
-        # Load and call
-        lib = ctypes.CDLL(lib_path)
-        lib_handle = lib._handle
-        func = lib.xtea_encrypt
-        func.argtypes = [
-            ctypes.POINTER(ctypes.c_uint32),
-            ctypes.POINTER(ctypes.c_uint32),
-            ctypes.c_int32,
-        ]
-        func.restype = None
-
-        v_buf = (ctypes.c_uint32 * 2)(v0_in, v1_in)
-        key_buf = (ctypes.c_uint32 * 4)(*key)
-        func(v_buf, key_buf, rounds)
-
-        assert v_buf[0] == ref_v0, f"v0 mismatch: {v_buf[0]:#x} != {ref_v0:#x}"
-        assert v_buf[1] == ref_v1, f"v1 mismatch: {v_buf[1]:#x} != {ref_v1:#x}"
-    finally:
-        # Unload DLL on Windows before cleanup
-        if lib_handle is not None and is_windows:
-            ctypes.windll.kernel32.FreeLibrary(ctypes.c_void_p(lib_handle))
-        import shutil
-        shutil.rmtree(tmpdir, ignore_errors=True)
+    assert v_buf[0] == ref_v0, f"v0 mismatch: {v_buf[0]:#x} != {ref_v0:#x}"
+    assert v_buf[1] == ref_v1, f"v1 mismatch: {v_buf[1]:#x} != {ref_v1:#x}"